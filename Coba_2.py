@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import datetime
 import os
+import csv
 import hashlib
 import pandas as pd
 import plotly.express as px 
@@ -46,9 +47,26 @@ def save_data(df, base_filename, username):
     df.to_csv(filename, index=False)
 
 def append_data(data, base_filename, username):
-    df = load_data(base_filename, username)
-    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-    save_data(df, base_filename, username)
+    # Hanya baris baru yang ditulis; header ditulis saat file pertama kali dibuat
+    filename = get_user_file(base_filename, username)
+    df_baru = pd.DataFrame([data])
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        with open(filename, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        if not set(df_baru.columns) <= set(header):
+            # Ada kolom yang belum ada di header, tulis ulang sekali agar header ikut diperbarui
+            df = pd.concat([load_data(base_filename, username), df_baru], ignore_index=True)
+            save_data(df, base_filename, username)
+            return
+        with open(filename, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        df_baru.reindex(columns=header).to_csv(filename, mode="a", header=False, index=False)
+    else:
+        kolom = list(load_data(base_filename, username).columns)
+        kolom += [c for c in df_baru.columns if c not in kolom]
+        df_baru.reindex(columns=kolom).to_csv(filename, index=False)
 
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan):
     return [
@@ -134,79 +152,84 @@ kategori_pemasukan = {
 
 # ---------------- Fungsi Pemasukan ----------------
 
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)") 
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip() or jumlah <= 0:
-            st.error("Isi data dengan benar.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode,
-            "Keterangan": deskripsi,
-            "Username": username
-        }
-        append_data(data, "pemasukan.csv", username)
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)") 
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip() or jumlah <= 0:
+                st.error("Isi data dengan benar.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode,
+                "Keterangan": deskripsi,
+                "Username": username
+            }
+            append_data(data, "pemasukan.csv", username)
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
+            for j in jurnal:
+                append_data(j, "jurnal.csv", username)
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------------- Fungsi Pengeluaran ----------------
 
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pengeluaran.csv", username)
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode,
+                "Username": username
+            }
+            append_data(data, "pengeluaran.csv", username)
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
+            for j in jurnal:
+                append_data(j, "jurnal.csv", username)
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------------- Fungsi Laporan ----------------
 
@@ -4,7 +4,6 @@ from datetime import datetime
 import os
 import plotly.express as px
 
-<<<<<<< HEAD
 # ---------- Inisialisasi File Kosong ----------
 import os
 import pandas as pd
@@ -21,9 +20,6 @@ def init_files():
 
 
 # ---------- Helper ----------
-=======
-# ---------- Helper Functions ----------
->>>>>>> 9bdc868443f2bd9142d3b2e9cc02e8ebf08dbca0
 def load_data(file):
     if os.path.exists(file):
         try:
@@ -41,8 +37,19 @@ def save_data(df, file):
 def append_data(data, file):
     df_new = pd.DataFrame([data])
     df = pd.concat([load_data(file), df_new], ignore_index=True)
+    if "Tanggal" in df.columns:
+        # Disimpan urut Tanggal agar laporan bisa memotong rentang dengan binary search
+        df = df.sort_values("Tanggal", kind="stable", na_position="last")
     save_data(df, file)
 
+def potong_tanggal(df, mulai, akhir):
+    # File disimpan urut Tanggal, jadi rentang cukup dicari dengan binary search
+    if not df["Tanggal"].is_monotonic_increasing:
+        df = df.sort_values("Tanggal", kind="stable", na_position="last")
+    kiri = df["Tanggal"].searchsorted(pd.to_datetime(mulai), side="left")
+    kanan = df["Tanggal"].searchsorted(pd.to_datetime(akhir), side="right")
+    return df.iloc[kiri:kanan]
+
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan, username):
     return [
         {"Tanggal": tanggal, "Akun": akun_debit, "Debit": jumlah, "Kredit": 0, "Keterangan": keterangan, "Username": username},
@@ -110,81 +117,86 @@ kategori_pemasukan = {
 }
 
 # ---------- Pemasukan ----------
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pemasukan.csv")
-
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber, username)
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode,
+                "Username": username
+            }
+            append_data(data, "pemasukan.csv")
+
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber, username)
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------- Pengeluaran ----------
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pengeluaran.csv")
-
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi, username)
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode,
+                "Username": username
+            }
+            append_data(data, "pengeluaran.csv")
+
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi, username)
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------- Laporan ----------
 def laporan():
@@ -207,26 +219,17 @@ def laporan():
             df["Tanggal"] = pd.to_datetime(df["Tanggal"], errors='coerce')
 
     if "Tanggal" in jurnal_df.columns and not jurnal_df.empty:
-        jurnal_df = jurnal_df[
-            (jurnal_df['Tanggal'] >= pd.to_datetime(mulai)) &
-            (jurnal_df['Tanggal'] <= pd.to_datetime(akhir))
-        ]
+        jurnal_df = potong_tanggal(jurnal_df, mulai, akhir)
     else:
         jurnal_df = pd.DataFrame()
 
     if "Tanggal" in pemasukan_df.columns and not pemasukan_df.empty:
-        pemasukan_df = pemasukan_df[
-            (pemasukan_df['Tanggal'] >= pd.to_datetime(mulai)) &
-            (pemasukan_df['Tanggal'] <= pd.to_datetime(akhir))
-        ]
+        pemasukan_df = potong_tanggal(pemasukan_df, mulai, akhir)
     else:
         pemasukan_df = pd.DataFrame()
 
     if "Tanggal" in pengeluaran_df.columns and not pengeluaran_df.empty:
-        pengeluaran_df = pengeluaran_df[
-            (pengeluaran_df['Tanggal'] >= pd.to_datetime(mulai)) &
-            (pengeluaran_df['Tanggal'] <= pd.to_datetime(akhir))
-        ]
+        pengeluaran_df = potong_tanggal(pengeluaran_df, mulai, akhir)
     else:
         pengeluaran_df = pd.DataFrame()
 
@@ -279,10 +282,7 @@ def laporan():
 # ---------- Main ----------
 def main():
     st.set_page_config(page_title="🌾 SiPadi", layout="centered")
-<<<<<<< HEAD
     init_files()  # <- WAJIB!
-=======
->>>>>>> 9bdc868443f2bd9142d3b2e9cc02e8ebf08dbca0
     st.markdown("<h1 style='color:#BAC095;'>🌱 SiPadi</h1>", unsafe_allow_html=True)
 
     if login():
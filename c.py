@@ -1,9 +1,21 @@
 import streamlit as st
 from datetime import datetime
 import os
+import csv
 import hashlib
+import hmac
+import re
+import io
+import threading
+import numpy as np
+from dataclasses import dataclass
 import pandas as pd
-import plotly.express as px
+from sipadi_core import (
+    FORMAT_TANGGAL, KOLOM_TABEL, kenalkan, kodekan, nama_tabel, empty_df, terapkan_skema,
+    rupiah, format_rupiah, baca_csv, urutkan_tanggal, potong_tanggal,
+    tulis_cookie_sesi, mulai_sesi, pulihkan_sesi, akhiri_sesi, muat_plotly, panaskan_impor,
+    get_kunci_posting, siapkan_baris, pulihkan_folder, commit_posting,
+)
 
 # ----------- Helper Functions ------------
 
@@ -15,72 +27,126 @@ def get_user_file(base_filename, username):
     return f"{name}_{username}{ext}"
 
 def load_data(base_filename, username):
+    pulihkan_posting(username)
     filename = get_user_file(base_filename, username)
+    tabel = nama_tabel(base_filename)
     if os.path.exists(filename):
-        try:
-            df = pd.read_csv(filename)
-            return df
-        except pd.errors.EmptyDataError:
-            return empty_df_by_file(base_filename)
-    else:
-        return empty_df_by_file(base_filename)
-
-def empty_df_by_file(base_filename):
-    if "pemasukan" in base_filename:
-        return pd.DataFrame(columns=["Tanggal", "Sumber", "Jumlah", "Metode", "Keterangan", "Username"])
-    elif "pengeluaran" in base_filename:
-        return pd.DataFrame(columns=["Tanggal", "Kategori", "Sub Kategori", "Jumlah", "Keterangan", "Metode", "Username"])
-    elif "jurnal" in base_filename:
-        return pd.DataFrame(columns=["Tanggal", "Akun", "Debit", "Kredit", "Keterangan", "Username"])
-    elif "akun" in base_filename:
-        return pd.DataFrame(columns=["Username", "Password"])
+        return urutkan_tanggal(baca_csv(filename, tabel))
     else:
-        return pd.DataFrame()
+        return empty_df(tabel)
 
 def save_data(df, base_filename, username):
     filename = get_user_file(base_filename, username)
-    df.to_csv(filename, index=False)
-
-def append_data(data, base_filename, username):
-    df = load_data(base_filename, username)
-    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-    save_data(df, base_filename, username)
+    df.to_csv(filename, index=False, date_format=FORMAT_TANGGAL)
+
+def pulihkan_posting(username, sementara=()):
+    pulihkan_folder(get_user_file("posting", username), username, sementara)
+
+def posting_jurnal(jurnal, data, base_filename, username):
+    # Dokumen sumber dan kedua baris jurnalnya ditulis dalam satu commit (lihat sipadi_core),
+    # jadi crash di tengah jalan tidak meninggalkan jurnal yang tidak seimbang
+    ledger = [([data], base_filename), (jurnal, "jurnal.csv")]
+    with get_kunci_posting(username):
+        pulihkan_posting(username, [get_user_file(base, username) for _, base in ledger])
+        tulisan = [
+            siapkan_baris(rows, get_user_file(base, username), KOLOM_TABEL[nama_tabel(base)])
+            for rows, base in ledger
+        ]
+        commit_posting(get_user_file("posting", username), tulisan)
 
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan, username):
+    jumlah = rupiah(jumlah)
     return [
         {"Tanggal": tanggal, "Akun": akun_debit, "Debit": jumlah, "Kredit": 0, "Keterangan": keterangan, "Username": username},
         {"Tanggal": tanggal, "Akun": akun_kredit, "Debit": 0, "Kredit": jumlah, "Keterangan": keterangan, "Username": username},
     ]
 
-def load_user_accounts():
-    if os.path.exists("akun.csv"):
-        return pd.read_csv("akun.csv")
-    else:
-        return pd.DataFrame(columns=["Username", "Password"])
+# Indeks username -> hash password dimuat sekali per proses; akun.csv hanya
+# ditambah satu baris per pendaftaran dan indeks membaca byte barunya saja.
+AKUN_FILE = "akun.csv"
+
+class IndeksAkun:
+    def __init__(self):
+        self.sandi = {}
+        self.posisi = 0
+        self.header = None
+        self.identitas = None
+        self.lock = threading.Lock()
 
-def save_user_accounts(df):
-    df.to_csv("akun.csv", index=False)
+    def sinkron(self):
+        try:
+            info = os.stat(AKUN_FILE)
+        except FileNotFoundError:
+            info = None
+        identitas = None if info is None else (info.st_dev, info.st_ino)
+        if identitas != self.identitas or (info is not None and info.st_size < self.posisi):
+            self.sandi, self.posisi, self.header, self.identitas = {}, 0, None, identitas
+        if info is None or info.st_size == self.posisi:
+            return
+        with open(AKUN_FILE, "rb") as f:
+            f.seek(self.posisi)
+            data = f.read()
+        selesai = data.rfind(b"\n") + 1  # baris yang belum lengkap ditunda
+        if selesai == 0:
+            return
+        baris = csv.reader(io.StringIO(data[:selesai].decode("utf-8"), newline=""))
+        if self.header is None:
+            self.header = next(baris, [])
+        i_user, i_sandi = self.header.index("Username"), self.header.index("Password")
+        for row in baris:
+            if len(row) > max(i_user, i_sandi):
+                self.sandi[row[i_user]] = row[i_sandi]
+        self.posisi += selesai
+
+    def cari(self, username):
+        with self.lock:
+            self.sinkron()
+            return self.sandi.get(username)
+
+    def daftar(self, username, sandi):
+        with self.lock:
+            self.sinkron()
+            if username in self.sandi:
+                return False  # Username sudah ada
+            teks = io.StringIO()
+            penulis = csv.writer(teks, lineterminator="\n")
+            if os.path.exists(AKUN_FILE) and os.path.getsize(AKUN_FILE) > 0:
+                with open(AKUN_FILE, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        teks.write("\n")
+                header = self.header
+            else:
+                header = KOLOM_TABEL["akun"]
+                penulis.writerow(header)
+            nilai = {"Username": username, "Password": sandi}
+            penulis.writerow([nilai.get(k, "") for k in header])
+            with open(AKUN_FILE, "a", newline="", encoding="utf-8") as f:
+                f.write(teks.getvalue())
+            self.sinkron()
+            return True
+
+@st.cache_resource
+def get_indeks_akun():
+    return IndeksAkun()
 
 def register_user(username, password):
-    akun_df = load_user_accounts()
-    if (akun_df['Username'] == username).any():
-        return False  # Username sudah ada
-    akun_df = pd.concat([akun_df, pd.DataFrame([{"Username": username, "Password": hash_password(password)}])], ignore_index=True)
-    save_user_accounts(akun_df)
-    return True
+    return get_indeks_akun().daftar(username, hash_password(password))
 
 def validate_login(username, password):
-    akun_df = load_user_accounts()
-    hashed_pw = hash_password(password)
-    return ((akun_df['Username'] == username) & (akun_df['Password'] == hashed_pw)).any()
+    tersimpan = get_indeks_akun().cari(username)
+    return tersimpan is not None and hmac.compare_digest(tersimpan, hash_password(password))
+
+# Token sesi ada di sipadi_core.py; tiap aplikasi memakai nama cookie sendiri.
+COOKIE_SESI = "petani_sesi"
 
 def load_csv_from_url(url):
     try:
         df = pd.read_csv(url)
-        return df
+        return urutkan_tanggal(terapkan_skema(df, nama_tabel(url)))
     except Exception as e:
         st.error(f"Gagal load data dari {url}: {e}")
-        return pd.DataFrame()
+        return empty_df(nama_tabel(url))
 
 # ----------- Data Kategori -------------
 
@@ -96,6 +162,75 @@ kategori_pemasukan = {
     "Sumber Pemasukan": ["Penjualan Padi", "Lain-lain"]
 }
 
+# ----------- Bagan Akun -------------
+KELAS_ASET, KELAS_KEWAJIBAN, KELAS_EKUITAS, KELAS_PENDAPATAN, KELAS_BEBAN = 1, 2, 3, 4, 5
+
+@dataclass(frozen=True)
+class AkunBagan:
+    kode: str
+    nama: str
+    kelas: int
+    induk: str = None
+
+    @property
+    def saldo_normal(self):
+        return "Debit" if self.kelas in (KELAS_ASET, KELAS_BEBAN) else "Kredit"
+
+def susun_bagan_akun():
+    # Akun beban diturunkan dari kategori pengeluaran: kategori menjadi induk, sub kategori menjadi akunnya
+    bagan = [
+        AkunBagan("1", "Aset", KELAS_ASET),
+        AkunBagan("1-1", "Kas", KELAS_ASET, "1"),
+        AkunBagan("1-2", "Bank", KELAS_ASET, "1"),
+        AkunBagan("1-3", "Piutang Dagang", KELAS_ASET, "1"),
+        AkunBagan("1-4", "Perlengkapan", KELAS_ASET, "1"),
+        AkunBagan("1-5", "Sewa Dibayar Dimuka", KELAS_ASET, "1"),
+        AkunBagan("1-6", "Peralatan", KELAS_ASET, "1"),
+        AkunBagan("2", "Kewajiban", KELAS_KEWAJIBAN),
+        AkunBagan("2-1", "Utang Dagang", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("2-2", "Pendapatan Diterima Dimuka", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("3", "Ekuitas", KELAS_EKUITAS),
+        AkunBagan("3-1", "Modal", KELAS_EKUITAS, "3"),
+        AkunBagan("3-2", "Prive", KELAS_EKUITAS, "3"),
+        AkunBagan("4", "Pendapatan Usaha", KELAS_PENDAPATAN),
+        AkunBagan("4-1", "Pendapatan", KELAS_PENDAPATAN, "4"),
+        AkunBagan("5", "Beban Usaha", KELAS_BEBAN),
+    ]
+    for i, (kategori, sub_kategori) in enumerate(kategori_pengeluaran.items(), start=1):
+        induk = f"5-{i}"
+        bagan.append(AkunBagan(induk, f"Beban {kategori}", KELAS_BEBAN, "5"))
+        for j, sub in enumerate(sub_kategori, start=1):
+            bagan.append(AkunBagan(f"{induk}-{j}", sub, KELAS_BEBAN, induk))
+    return {akun.nama: akun for akun in bagan}
+
+BAGAN_AKUN = susun_bagan_akun()
+# Kode kategori Akun yang tetap untuk semua user hanyalah nama-nama di bagan akun
+kenalkan("Akun", BAGAN_AKUN)
+
+# Akun di luar bagan hanya digolongkan jika namanya jelas; sisanya KELAS_TAK_DIKENAL
+# dan ditampilkan di laporan, tidak diam-diam dihitung sebagai beban
+KELAS_TAK_DIKENAL = 0
+POLA_PENDAPATAN = re.compile("pendapatan|penjualan", re.IGNORECASE)
+POLA_BEBAN = re.compile("beban|pengeluaran|gaji|pajak|harga pokok", re.IGNORECASE)
+
+def kelas_akun(akun):
+    if akun in BAGAN_AKUN:
+        return BAGAN_AKUN[akun].kelas
+    # Beban dicek dulu: "Harga Pokok Penjualan" adalah beban walau memuat kata penjualan
+    if POLA_BEBAN.search(str(akun)):
+        return KELAS_BEBAN
+    if POLA_PENDAPATAN.search(str(akun)):
+        return KELAS_PENDAPATAN
+    return KELAS_TAK_DIKENAL
+
+PESAN_AKUN_TAK_DIKENAL = "Akun di luar bagan akun, belum dihitung di laporan: "
+
+def kode_kelas(kolom):
+    # Kelas dihitung sekali per kategori Akun, lalu disebar ke tiap baris lewat kode integer
+    kolom = kodekan("Akun", kolom)
+    per_kategori = np.array([kelas_akun(a) for a in kolom.cat.categories] + [KELAS_TAK_DIKENAL], dtype=np.int8)
+    return pd.Series(per_kategori[kolom.cat.codes.to_numpy()], index=kolom.index)
+
 # ----------- Fungsi Login / Register -------------
 
 def login_register():
@@ -105,6 +240,14 @@ def login_register():
         st.session_state['username'] = ""
 
     if st.session_state['logged_in']:
+        tulis_cookie_sesi(COOKIE_SESI)
+        return True
+
+    username = pulihkan_sesi(COOKIE_SESI)
+    tulis_cookie_sesi(COOKIE_SESI)
+    if username:
+        st.session_state['logged_in'] = True
+        st.session_state['username'] = username
         return True
 
     st.title("🔐 Login / Daftar Akun")
@@ -120,8 +263,9 @@ def login_register():
             elif validate_login(username, password):
                 st.session_state['logged_in'] = True
                 st.session_state['username'] = username
+                mulai_sesi(username)
                 st.success(f"Login berhasil! Selamat datang, {username}.")
-                st.experimental_rerun()
+                st.rerun()
             else:
                 st.error("Username atau password salah.")
 
@@ -138,89 +282,141 @@ def login_register():
 
 # ----------- Fungsi Pemasukan -------------
 
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip() or jumlah <= 0:
-            st.error("Isi data dengan benar.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode,
-            "Keterangan": deskripsi,
-            "Username": username
-        }
-        append_data(data, "pemasukan.csv", username)
-
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber, username)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip() or jumlah <= 0:
+                st.error("Isi data dengan benar.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode,
+                "Keterangan": deskripsi,
+                "Username": username
+            }
+
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber, username)
+            posting_jurnal(jurnal, data, "pemasukan.csv", username)
+
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ----------- Fungsi Pengeluaran -------------
 
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pengeluaran.csv", username)
-
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi, username)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode,
+                "Username": username
+            }
+
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi, username)
+            posting_jurnal(jurnal, data, "pengeluaran.csv", username)
+
+            st.success("✅ Pengeluaran berhasil disimpan.")
+
+# ----------- Data Grafik -------------
+
+MAKS_TITIK_GRAFIK = 500
+NAMA_GRANULARITAS = {"D": "harian", "W": "mingguan", "MS": "bulanan"}
+
+def pilih_granularitas(mulai, akhir):
+    # Granularitas terhalus yang jumlah titiknya masih muat di MAKS_TITIK_GRAFIK
+    # (harian sampai ~16 bulan, mingguan sampai ~9 tahun); downsample_minmax
+    # menjaga batas yang sama untuk rentang bulanan yang lebih panjang lagi
+    hari = (pd.Timestamp(akhir) - pd.Timestamp(mulai)).days + 1
+    if hari <= MAKS_TITIK_GRAFIK:
+        return "D"
+    if -(-hari // 7) + 1 <= MAKS_TITIK_GRAFIK:
+        return "W"
+    return "MS"
+
+def downsample_minmax(df, maks=MAKS_TITIK_GRAFIK):
+    # Titik dibagi ke kelompok berurutan; dari tiap kelompok hanya titik terendah dan
+    # tertinggi tiap seri yang disimpan, sehingga puncak dan lembah tetap terlihat
+    if len(df) <= maks:
+        return df
+    jumlah_kelompok = max(1, maks // (2 * len(df.columns)))
+    ukuran = -(-len(df) // jumlah_kelompok)
+    data = df.reset_index(drop=True)
+    kelompok = np.arange(len(df)) // ukuran
+    pilih = set()
+    for kolom in data.columns:
+        per_kelompok = data[kolom].groupby(kelompok)
+        pilih.update(per_kelompok.idxmin())
+        pilih.update(per_kelompok.idxmax())
+    return df.iloc[sorted(pilih)]
+
+def versi_file(filename):
+    try:
+        info = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+@st.cache_data(max_entries=64)
+def data_grafik(username, mulai, akhir, granularitas, versi, _jurnal_df):
+    # Kunci cache: (user, rentang, granularitas) plus versi data jurnal agar posting baru ikut terlihat
+    kelas = kode_kelas(_jurnal_df["Akun"])
+    df = pd.DataFrame({
+        "Pendapatan": _jurnal_df["Kredit"].where(kelas == KELAS_PENDAPATAN, 0),
+        "Beban": _jurnal_df["Debit"].where(kelas == KELAS_BEBAN, 0),
+    })
+    df.index = pd.DatetimeIndex(_jurnal_df["Tanggal"])
+    return downsample_minmax(df[df.index.notna()].resample(granularitas).sum())
 
 # ----------- Fungsi Laporan -------------
 
 def laporan():
     st.header("Laporan Keuangan")
     username = st.session_state['username']
+    px = muat_plotly()
 
     mulai = st.date_input("Tanggal Mulai", datetime.now().replace(day=1))
     akhir = st.date_input("Tanggal Akhir", datetime.now())
@@ -231,9 +427,11 @@ def laporan():
     pengeluaran_df = load_data("pengeluaran.csv", username)
 
     # Kalau kosong, coba load dari URL contoh data (opsional, bisa dihilangkan kalau hanya mau data lokal)
+    sumber_jurnal = get_user_file("jurnal.csv", username)
     if jurnal_df.empty:
         url_jurnal = "https://raw.githubusercontent.com/royalex0105/aplikasi-keuangan-petani/main/jurnal.csv"
         jurnal_df = load_csv_from_url(url_jurnal)
+        sumber_jurnal = None
     if pemasukan_df.empty:
         url_pemasukan = "https://raw.githubusercontent.com/royalex0105/aplikasi-keuangan-petani/main/pemasukan.csv"
         pemasukan_df = load_csv_from_url(url_pemasukan)
@@ -241,17 +439,13 @@ def laporan():
         url_pengeluaran = "https://raw.githubusercontent.com/royalex0105/aplikasi-keuangan-petani/main/pengeluaran.csv"
         pengeluaran_df = load_csv_from_url(url_pengeluaran)
 
-    for df in [jurnal_df, pemasukan_df, pengeluaran_df]:
-        if not df.empty and "Tanggal" in df.columns:
-            df["Tanggal"] = pd.to_datetime(df["Tanggal"], errors='coerce')
-
-    jurnal_df = jurnal_df[(jurnal_df["Tanggal"] >= pd.to_datetime(mulai)) & (jurnal_df["Tanggal"] <= pd.to_datetime(akhir))]
+    jurnal_df = potong_tanggal(jurnal_df, mulai, akhir)
 
     st.subheader("Jurnal Umum")
     st.dataframe(jurnal_df)
 
     # Buku Besar: total debit dan kredit per akun
-    buku_besar = jurnal_df.groupby("Akun").agg(
+    buku_besar = jurnal_df.groupby("Akun", observed=True).agg(
         Total_Debit=pd.NamedAgg(column="Debit", aggfunc="sum"),
         Total_Kredit=pd.NamedAgg(column="Kredit", aggfunc="sum")
     ).reset_index()
@@ -261,30 +455,35 @@ def laporan():
     st.dataframe(buku_besar)
 
     # Laba Rugi sederhana: Pendapatan - Beban
-    pendapatan = jurnal_df[jurnal_df["Akun"].str.lower().str.contains("pendapatan|penjualan")]
+    kelas = kode_kelas(jurnal_df["Akun"])
+    tak_dikenal = jurnal_df.loc[kelas == KELAS_TAK_DIKENAL, "Akun"].dropna().unique()
+    if len(tak_dikenal):
+        st.warning(PESAN_AKUN_TAK_DIKENAL + ", ".join(map(str, tak_dikenal)))
+    pendapatan = jurnal_df[kelas == KELAS_PENDAPATAN]
     total_pendapatan = pendapatan["Kredit"].sum() - pendapatan["Debit"].sum()
 
-    beban = jurnal_df[jurnal_df["Akun"].str.lower().str.contains("beban|pengeluaran|gaji|pajak")]
+    beban = jurnal_df[kelas == KELAS_BEBAN]
     total_beban = beban["Debit"].sum() - beban["Kredit"].sum()
 
     laba_rugi = total_pendapatan - total_beban
 
     st.subheader("Laporan Laba Rugi Sederhana")
-    st.write(f"Total Pendapatan: Rp {total_pendapatan:,.0f}")
-    st.write(f"Total Beban: Rp {total_beban:,.0f}")
-    st.write(f"Laba / Rugi Bersih: Rp {laba_rugi:,.0f}")
-
-    # Grafik pendapatan dan beban per tanggal
-    pendapatan_per_tgl = pendapatan.groupby("Tanggal")["Kredit"].sum()
-    beban_per_tgl = beban.groupby("Tanggal")["Debit"].sum()
-
-    df_grafik = pd.DataFrame({
-        "Pendapatan": pendapatan_per_tgl,
-        "Beban": beban_per_tgl
-    }).fillna(0)
+    st.write(f"Total Pendapatan: {format_rupiah(total_pendapatan)}")
+    st.write(f"Total Beban: {format_rupiah(total_beban)}")
+    st.write(f"Laba / Rugi Bersih: {format_rupiah(laba_rugi)}")
+
+    # Grafik pendapatan dan beban per hari/minggu/bulan sesuai panjang rentang
+    granularitas = pilih_granularitas(mulai, akhir)
+    if sumber_jurnal is not None:
+        versi = versi_file(sumber_jurnal)
+    else:
+        # Data contoh dari URL tidak punya versi file, jadi isinya sendiri yang menjadi versi
+        versi = ("url", int(pd.util.hash_pandas_object(jurnal_df).sum()))
+    df_grafik = data_grafik(username, mulai, akhir, granularitas, versi, jurnal_df)
 
     if not df_grafik.empty:
-        fig = px.line(df_grafik, x=df_grafik.index, y=["Pendapatan", "Beban"], title="Grafik Pendapatan & Beban")
+        fig = px.line(df_grafik, x=df_grafik.index, y=["Pendapatan", "Beban"],
+                      title=f"Grafik Pendapatan & Beban ({NAMA_GRANULARITAS[granularitas]})")
         st.plotly_chart(fig)
 
 # ----------- Main Application -------------
@@ -294,6 +493,7 @@ def main():
 
     if not login_register():
         return
+    panaskan_impor()
 
     st.sidebar.title(f"Selamat Datang, {st.session_state['username']}!")
     menu = st.sidebar.selectbox("Menu", ["Pemasukan", "Pengeluaran", "Laporan", "Logout"])
@@ -305,9 +505,10 @@ def main():
     elif menu == "Laporan":
         laporan()
     elif menu == "Logout":
+        akhiri_sesi()
         st.session_state['logged_in'] = False
         st.session_state['username'] = ""
-        st.experimental_rerun()
+        st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,21 @@
 import streamlit as st
 from datetime import datetime
 import os
+import csv
 import hashlib
+import hmac
+import re
+import io
+import threading
+import numpy as np
+from dataclasses import dataclass
 import pandas as pd
-import plotly.express as px 
+from sipadi_core import (
+    FORMAT_TANGGAL, KOLOM_TABEL, kenalkan, kodekan, nama_tabel, empty_df,
+    rupiah, format_rupiah, baca_csv,
+    tulis_cookie_sesi, mulai_sesi, pulihkan_sesi, akhiri_sesi, muat_plotly, panaskan_impor,
+    get_kunci_posting, siapkan_baris, pulihkan_folder, commit_posting,
+)
 
 # Atur layout halaman
 st.set_page_config(
@@ -51,67 +63,118 @@ def get_user_file(base_filename, username):
     return f"{name}_{username}{ext}"
 
 def load_data(base_filename, username):
+    pulihkan_posting(username)
     filename = get_user_file(base_filename, username)
+    tabel = nama_tabel(base_filename)
     if os.path.exists(filename):
-        try:
-            return pd.read_csv(filename)
-        except pd.errors.EmptyDataError:
-            # Jika file kosong, buat DataFrame kosong dengan kolom sesuai file yang dipakai
-            if "pemasukan" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Sumber", "Jumlah", "Metode", "Keterangan", "Username"])
-            elif "pengeluaran" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Kategori", "Sub Kategori", "Jumlah", "Keterangan", "Metode", "Username"])
-            elif "jurnal" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Akun", "Debit", "Kredit", "Keterangan"])
-            else:
-                return pd.DataFrame()
+        return baca_csv(filename, tabel)
     else:
-        # Jika file belum ada, buat DataFrame kosong dengan kolom sesuai file
-        if "pemasukan" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Sumber", "Jumlah", "Metode", "Keterangan", "Username"])
-        elif "pengeluaran" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Kategori", "Sub Kategori", "Jumlah", "Keterangan", "Metode", "Username"])
-        elif "jurnal" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Akun", "Debit", "Kredit", "Keterangan"])
-        else:
-            return pd.DataFrame()
+        return empty_df(tabel)
 
 def save_data(df, base_filename, username):
     filename = get_user_file(base_filename, username)
-    df.to_csv(filename, index=False)
-
-def append_data(data, base_filename, username):
-    df = load_data(base_filename, username)
-    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-    save_data(df, base_filename, username)
+    df.to_csv(filename, index=False, date_format=FORMAT_TANGGAL)
+
+def pulihkan_posting(username, sementara=()):
+    pulihkan_folder(get_user_file("posting", username), username, sementara)
+
+def posting_jurnal(jurnal, data, base_filename, username):
+    # Dokumen sumber dan kedua baris jurnalnya ditulis dalam satu commit (lihat sipadi_core),
+    # jadi crash di tengah jalan tidak meninggalkan jurnal yang tidak seimbang
+    ledger = [([data], base_filename), (jurnal, "jurnal.csv")]
+    with get_kunci_posting(username):
+        pulihkan_posting(username, [get_user_file(base, username) for _, base in ledger])
+        tulisan = [
+            siapkan_baris(rows, get_user_file(base, username), KOLOM_TABEL[nama_tabel(base)])
+            for rows, base in ledger
+        ]
+        commit_posting(get_user_file("posting", username), tulisan)
 
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan):
+    jumlah = rupiah(jumlah)
     return [
         {"Tanggal": tanggal, "Akun": akun_debit, "Debit": jumlah, "Kredit": 0, "Keterangan": keterangan},
         {"Tanggal": tanggal, "Akun": akun_kredit, "Debit": 0, "Kredit": jumlah, "Keterangan": keterangan},
     ]
 
-def load_user_accounts():
-    if os.path.exists("akun.csv"):
-        return pd.read_csv("akun.csv")
-    else:
-        return pd.DataFrame(columns=["Username", "Password"])
+# Indeks username -> hash password dimuat sekali per proses; akun.csv hanya
+# ditambah satu baris per pendaftaran dan indeks membaca byte barunya saja.
+AKUN_FILE = "akun.csv"
 
-def save_user_accounts(df):
-    df.to_csv("akun.csv", index=False)
+class IndeksAkun:
+    def __init__(self):
+        self.sandi = {}
+        self.posisi = 0
+        self.header = None
+        self.identitas = None
+        self.lock = threading.Lock()
+
+    def sinkron(self):
+        try:
+            info = os.stat(AKUN_FILE)
+        except FileNotFoundError:
+            info = None
+        identitas = None if info is None else (info.st_dev, info.st_ino)
+        if identitas != self.identitas or (info is not None and info.st_size < self.posisi):
+            self.sandi, self.posisi, self.header, self.identitas = {}, 0, None, identitas
+        if info is None or info.st_size == self.posisi:
+            return
+        with open(AKUN_FILE, "rb") as f:
+            f.seek(self.posisi)
+            data = f.read()
+        selesai = data.rfind(b"\n") + 1  # baris yang belum lengkap ditunda
+        if selesai == 0:
+            return
+        baris = csv.reader(io.StringIO(data[:selesai].decode("utf-8"), newline=""))
+        if self.header is None:
+            self.header = next(baris, [])
+        i_user, i_sandi = self.header.index("Username"), self.header.index("Password")
+        for row in baris:
+            if len(row) > max(i_user, i_sandi):
+                self.sandi[row[i_user]] = row[i_sandi]
+        self.posisi += selesai
+
+    def cari(self, username):
+        with self.lock:
+            self.sinkron()
+            return self.sandi.get(username)
+
+    def daftar(self, username, sandi):
+        with self.lock:
+            self.sinkron()
+            if username in self.sandi:
+                return False  # Username sudah ada
+            teks = io.StringIO()
+            penulis = csv.writer(teks, lineterminator="\n")
+            if os.path.exists(AKUN_FILE) and os.path.getsize(AKUN_FILE) > 0:
+                with open(AKUN_FILE, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        teks.write("\n")
+                header = self.header
+            else:
+                header = KOLOM_TABEL["akun"]
+                penulis.writerow(header)
+            nilai = {"Username": username, "Password": sandi}
+            penulis.writerow([nilai.get(k, "") for k in header])
+            with open(AKUN_FILE, "a", newline="", encoding="utf-8") as f:
+                f.write(teks.getvalue())
+            self.sinkron()
+            return True
+
+@st.cache_resource
+def get_indeks_akun():
+    return IndeksAkun()
 
 def register_user(username, password):
-    akun_df = load_user_accounts()
-    if (akun_df['Username'] == username).any():
-        return False  # Username sudah ada
-    akun_df = pd.concat([akun_df, pd.DataFrame([{"Username": username, "Password": hash_password(password)}])], ignore_index=True)
-    save_user_accounts(akun_df)
-    return True
+    return get_indeks_akun().daftar(username, hash_password(password))
 
 def validate_login(username, password):
-    akun_df = load_user_accounts()
-    hashed_pw = hash_password(password)
-    return ((akun_df['Username'] == username) & (akun_df['Password'] == hashed_pw)).any()
+    tersimpan = get_indeks_akun().cari(username)
+    return tersimpan is not None and hmac.compare_digest(tersimpan, hash_password(password))
+
+# Token sesi ada di sipadi_core.py; tiap aplikasi memakai nama cookie sendiri.
+COOKIE_SESI = "hebat_sesi"
 
 import streamlit as st
 
@@ -124,6 +187,14 @@ def login_register():
         st.session_state['username'] = ""
 
     if st.session_state['logged_in']:
+        tulis_cookie_sesi(COOKIE_SESI)
+        return True
+
+    username = pulihkan_sesi(COOKIE_SESI)
+    tulis_cookie_sesi(COOKIE_SESI)
+    if username:
+        st.session_state['logged_in'] = True
+        st.session_state['username'] = username
         return True
 
     st.title("🔐 Login / Daftar Akun")
@@ -139,6 +210,7 @@ def login_register():
             elif validate_login(username, password):
                 st.session_state['logged_in'] = True
                 st.session_state['username'] = username
+                mulai_sesi(username)
                 st.success(f"Login berhasil! Selamat datang, {username}.")
                 st.rerun()
             else:
@@ -169,109 +241,173 @@ kategori_pemasukan = {
     "Sumber Pemasukan": ["Penjualan Padi", "Lain-lain"]
 }
 
+# ---------------- Bagan Akun ----------------
+KELAS_ASET, KELAS_KEWAJIBAN, KELAS_EKUITAS, KELAS_PENDAPATAN, KELAS_BEBAN = 1, 2, 3, 4, 5
+
+@dataclass(frozen=True)
+class AkunBagan:
+    kode: str
+    nama: str
+    kelas: int
+    induk: str = None
+
+    @property
+    def saldo_normal(self):
+        return "Debit" if self.kelas in (KELAS_ASET, KELAS_BEBAN) else "Kredit"
+
+def susun_bagan_akun():
+    # Akun beban diturunkan dari kategori pengeluaran: kategori menjadi induk, sub kategori menjadi akunnya
+    bagan = [
+        AkunBagan("1", "Aset", KELAS_ASET),
+        AkunBagan("1-1", "Kas", KELAS_ASET, "1"),
+        AkunBagan("1-2", "Bank", KELAS_ASET, "1"),
+        AkunBagan("1-3", "Piutang Dagang", KELAS_ASET, "1"),
+        AkunBagan("1-4", "Perlengkapan", KELAS_ASET, "1"),
+        AkunBagan("1-5", "Sewa Dibayar Dimuka", KELAS_ASET, "1"),
+        AkunBagan("1-6", "Peralatan", KELAS_ASET, "1"),
+        AkunBagan("2", "Kewajiban", KELAS_KEWAJIBAN),
+        AkunBagan("2-1", "Utang Dagang", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("2-2", "Pendapatan Diterima Dimuka", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("3", "Ekuitas", KELAS_EKUITAS),
+        AkunBagan("3-1", "Modal", KELAS_EKUITAS, "3"),
+        AkunBagan("3-2", "Prive", KELAS_EKUITAS, "3"),
+        AkunBagan("4", "Pendapatan Usaha", KELAS_PENDAPATAN),
+        AkunBagan("4-1", "Pendapatan", KELAS_PENDAPATAN, "4"),
+        AkunBagan("5", "Beban Usaha", KELAS_BEBAN),
+    ]
+    for i, (kategori, sub_kategori) in enumerate(kategori_pengeluaran.items(), start=1):
+        induk = f"5-{i}"
+        bagan.append(AkunBagan(induk, f"Beban {kategori}", KELAS_BEBAN, "5"))
+        for j, sub in enumerate(sub_kategori, start=1):
+            bagan.append(AkunBagan(f"{induk}-{j}", sub, KELAS_BEBAN, induk))
+    return {akun.nama: akun for akun in bagan}
+
+BAGAN_AKUN = susun_bagan_akun()
+# Kode kategori Akun yang tetap untuk semua user hanyalah nama-nama di bagan akun
+kenalkan("Akun", BAGAN_AKUN)
+
+# Akun di luar bagan hanya digolongkan jika namanya jelas; sisanya KELAS_TAK_DIKENAL
+# dan ditampilkan di laporan, tidak diam-diam dihitung sebagai beban
+KELAS_TAK_DIKENAL = 0
+POLA_PENDAPATAN = re.compile("pendapatan|penjualan", re.IGNORECASE)
+POLA_BEBAN = re.compile("beban|pengeluaran|gaji|pajak|harga pokok", re.IGNORECASE)
+
+def kelas_akun(akun):
+    if akun in BAGAN_AKUN:
+        return BAGAN_AKUN[akun].kelas
+    # Beban dicek dulu: "Harga Pokok Penjualan" adalah beban walau memuat kata penjualan
+    if POLA_BEBAN.search(str(akun)):
+        return KELAS_BEBAN
+    if POLA_PENDAPATAN.search(str(akun)):
+        return KELAS_PENDAPATAN
+    return KELAS_TAK_DIKENAL
+
+PESAN_AKUN_TAK_DIKENAL = "Akun di luar bagan akun, belum dihitung di laporan: "
+
+def kode_kelas(kolom):
+    # Kelas dihitung sekali per kategori Akun, lalu disebar ke tiap baris lewat kode integer
+    kolom = kodekan("Akun", kolom)
+    per_kategori = np.array([kelas_akun(a) for a in kolom.cat.categories] + [KELAS_TAK_DIKENAL], dtype=np.int8)
+    return pd.Series(per_kategori[kolom.cat.codes.to_numpy()], index=kolom.index)
+
 # ---------------- Fungsi Pemasukan ----------------
 
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)") 
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip() or jumlah <= 0:
-            st.error("Isi data dengan benar.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode,
-            "Keterangan": deskripsi,
-            "Username": username
-        }
-        append_data(data, "pemasukan.csv", username)
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
+        deskripsi = st.text_area("Keterangan (opsional)") 
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip() or jumlah <= 0:
+                st.error("Isi data dengan benar.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode,
+                "Keterangan": deskripsi,
+                "Username": username
+            }
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
+            posting_jurnal(jurnal, data, "pemasukan.csv", username)
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------------- Fungsi Pengeluaran ----------------
 
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pengeluaran.csv", username)
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode,
+                "Username": username
+            }
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
+            posting_jurnal(jurnal, data, "pengeluaran.csv", username)
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------------- Fungsi Laporan ----------------
 
 def laporan():
     st.header("Laporan Keuangan")
     username = st.session_state['username']
+    px = muat_plotly()
 
     mulai = st.date_input("Tanggal Mulai", datetime.now().replace(day=1))
     akhir = st.date_input("Tanggal Akhir", datetime.now())
 
-    pemasukan_df = load_data("pemasukan.csv", username)
-    pengeluaran_df = load_data("pengeluaran.csv", username)
-    jurnal_df = load_data("jurnal.csv", username)
-
-    for df in [pemasukan_df, pengeluaran_df, jurnal_df]:
-        if not df.empty and "Tanggal" in df.columns:
-            df["Tanggal"] = pd.to_datetime(df["Tanggal"], errors='coerce')
-
-    jurnal_df = jurnal_df[(jurnal_df['Tanggal'] >= pd.to_datetime(mulai)) & (jurnal_df['Tanggal'] <= pd.to_datetime(akhir))]
-
-    tabs = st.tabs(["Ringkasan", "Jurnal Umum", "Buku Besar", "Laba Rugi", "Neraca"])
+    # Hanya bagian yang dipilih yang dimuat dan dihitung; bagian lain tidak disentuh
+    bagian = st.radio("Bagian Laporan", ["Ringkasan", "Jurnal Umum", "Buku Besar", "Laba Rugi", "Neraca"], horizontal=True)
 
-    with tabs[0]:
+    if bagian == "Ringkasan":
+        pemasukan_df = load_data("pemasukan.csv", username)
+        pengeluaran_df = load_data("pengeluaran.csv", username)
         total_pemasukan = pemasukan_df[(pemasukan_df['Tanggal'] >= pd.to_datetime(mulai)) & (pemasukan_df['Tanggal'] <= pd.to_datetime(akhir))]['Jumlah'].sum() if not pemasukan_df.empty else 0
         total_pengeluaran = pengeluaran_df[(pengeluaran_df['Tanggal'] >= pd.to_datetime(mulai)) & (pengeluaran_df['Tanggal'] <= pd.to_datetime(akhir))]['Jumlah'].sum() if not pengeluaran_df.empty else 0
 
-        st.metric("Total Pemasukan", f"Rp {total_pemasukan:,.0f}")
-        st.metric("Total Pengeluaran", f"Rp {total_pengeluaran:,.0f}")
+        st.metric("Total Pemasukan", format_rupiah(total_pemasukan))
+        st.metric("Total Pengeluaran", format_rupiah(total_pengeluaran))
 
         if total_pemasukan > 0 or total_pengeluaran > 0:
             df_sum = pd.DataFrame({
@@ -280,12 +416,17 @@ def laporan():
             })
             fig = px.pie(df_sum, values='Jumlah', names='Kategori')
             st.plotly_chart(fig)
+        return
+
+    jurnal_df = load_data("jurnal.csv", username)
+    jurnal_df = jurnal_df[(jurnal_df['Tanggal'] >= pd.to_datetime(mulai)) & (jurnal_df['Tanggal'] <= pd.to_datetime(akhir))]
 
-    with tabs[1]:
+    if bagian == "Jurnal Umum":
         st.markdown("### Jurnal Umum")
         st.dataframe(jurnal_df if not jurnal_df.empty else pd.DataFrame())
+        return
 
-    with tabs[2]:
+    if bagian == "Buku Besar":
         if not jurnal_df.empty:
             akun_list = jurnal_df['Akun'].unique()
             for akun in akun_list:
@@ -295,29 +436,36 @@ def laporan():
                 df_akun['Saldo'] = df_akun['Debit'] - df_akun['Kredit']
                 df_akun['Saldo'] = df_akun['Saldo'].cumsum()
                 st.dataframe(df_akun)
+        return
 
-    with tabs[3]:
-        pendapatan = jurnal_df[jurnal_df['Akun'].str.contains("Pendapatan")]['Kredit'].sum() if not jurnal_df.empty else 0
-        beban = jurnal_df[~jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang', 'Utang Dagang', 'Pendapatan'])]['Debit'].sum() if not jurnal_df.empty else 0
-        laba_rugi = pendapatan - beban
-        st.metric("Pendapatan", f"Rp {pendapatan:,.0f}")
-        st.metric("Beban", f"Rp {beban:,.0f}")
-        st.metric("Laba / Rugi", f"Rp {laba_rugi:,.0f}")
-
-    with tabs[4]:
-        aktiva = jurnal_df[jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang'])]['Debit'].sum() - jurnal_df[jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang'])]['Kredit'].sum() if not jurnal_df.empty else 0
-        kewajiban = jurnal_df[jurnal_df['Akun'].isin(['Utang Dagang'])]['Kredit'].sum() - jurnal_df[jurnal_df['Akun'].isin(['Utang Dagang'])]['Debit'].sum() if not jurnal_df.empty else 0
-        ekuitas = laba_rugi
-        st.metric("Aktiva", f"Rp {aktiva:,.0f}")
-        st.metric("Kewajiban", f"Rp {kewajiban:,.0f}")
-        st.metric("Ekuitas", f"Rp {ekuitas:,.0f}")
-    
-    if not pemasukan_df.empty and 'Username' in pemasukan_df.columns:
-        pemasukan_df = pemasukan_df[pemasukan_df['Username'] == username]
-    if not pengeluaran_df.empty and 'Username' in pengeluaran_df.columns:
-        pengeluaran_df = pengeluaran_df[pengeluaran_df['Username'] == username]
-    if not jurnal_df.empty and 'Username' in jurnal_df.columns:
-        jurnal_df = jurnal_df[jurnal_df['Username'] == username]
+    # Laba Rugi dan Neraca dari satu groupby kode kelas per baris jurnal
+    if not jurnal_df.empty:
+        kelas = kode_kelas(jurnal_df['Akun'])
+        per_kelas = jurnal_df.groupby(kelas)[['Debit', 'Kredit']].sum()
+        tak_dikenal = jurnal_df.loc[kelas == KELAS_TAK_DIKENAL, 'Akun'].dropna().unique()
+        if len(tak_dikenal):
+            st.warning(PESAN_AKUN_TAK_DIKENAL + ", ".join(map(str, tak_dikenal)))
+    else:
+        per_kelas = pd.DataFrame(columns=['Debit', 'Kredit'], dtype="int64")
+
+    def total(kode, kolom):
+        return int(per_kelas[kolom].get(kode, 0))
+
+    pendapatan = total(KELAS_PENDAPATAN, 'Kredit')
+    beban = total(KELAS_BEBAN, 'Debit')
+    laba_rugi = pendapatan - beban
+
+    if bagian == "Laba Rugi":
+        st.metric("Pendapatan", format_rupiah(pendapatan))
+        st.metric("Beban", format_rupiah(beban))
+        st.metric("Laba / Rugi", format_rupiah(laba_rugi))
+    else:
+        aktiva = total(KELAS_ASET, 'Debit') - total(KELAS_ASET, 'Kredit')
+        kewajiban = total(KELAS_KEWAJIBAN, 'Kredit') - total(KELAS_KEWAJIBAN, 'Debit')
+        ekuitas = total(KELAS_EKUITAS, 'Kredit') - total(KELAS_EKUITAS, 'Debit') + laba_rugi
+        st.metric("Aktiva", format_rupiah(aktiva))
+        st.metric("Kewajiban", format_rupiah(kewajiban))
+        st.metric("Ekuitas", format_rupiah(ekuitas))
 
 # ---------------- UI Utama ----------------
 
@@ -329,6 +477,7 @@ def main():
     logged_in = login_register()
     if not logged_in:
         return
+    panaskan_impor()
     
     menu = st.sidebar.radio("Pilih Menu", ["Beranda", "Pemasukan", "Pengeluaran", "Laporan", "Logout"])
 
@@ -351,6 +500,7 @@ def main():
         laporan()
 
     elif menu == "Logout":
+        akhiri_sesi()
         st.session_state['logged_in'] = False
         st.session_state['username'] = ""
         st.rerun()
@@ -48,6 +48,10 @@ def init_files():
 def format_rp(value):
     return f"Rp {value:,.0f}".replace(",", ".")
 
+def kolom_rp(*kolom):
+    # Angka tabel diformat oleh browser, bukan lewat Styler per sel di Python
+    return {k: st.column_config.NumberColumn(f"{k} (Rp)", format="localized") for k in kolom}
+
 # ---------- Login ----------
 def login():
     st.image("C:/Users/user/Pictures/Saved Pictures/logo.jpg", width=120)
@@ -77,89 +81,99 @@ kategori_pengeluaran = {
 }
 
 # ---------- Pemasukan ----------
+@st.fragment
 def pemasukan():
     st.subheader("💰 Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal pemasukan")
-    sumber = st.text_input("📝 Sumber Pemasukan (misal: Penjualan Padi)", placeholder="Contoh: Penjualan Padi")
-    jumlah = st.number_input("💵 Jumlah (Rp)", min_value=0, step=1000, help="Masukkan jumlah pemasukan")
-    metode = st.radio("💳 Metode Penerimaan", ["Tunai", "Transfer"], index=0)
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip():
-            st.error("Sumber pemasukan tidak boleh kosong.")
-            return
-        if jumlah <= 0:
-            st.error("Jumlah pemasukan harus lebih dari 0.")
-            return
-        waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
-        data = {"Tanggal": waktu, "Sumber": sumber, "Jumlah": jumlah, "Metode": metode}
-        append_data(data, "pemasukan.csv")
-        akun_debit = "Kas" if metode == "Tunai" else "Bank"
-        jurnal = buat_jurnal(waktu, akun_debit, "Pendapatan", jumlah, sumber)
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal pemasukan")
+        sumber = st.text_input("📝 Sumber Pemasukan (misal: Penjualan Padi)", placeholder="Contoh: Penjualan Padi")
+        jumlah = st.number_input("💵 Jumlah (Rp)", min_value=0, step=1000, help="Masukkan jumlah pemasukan")
+        metode = st.radio("💳 Metode Penerimaan", ["Tunai", "Transfer"], index=0)
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip():
+                st.error("Sumber pemasukan tidak boleh kosong.")
+                return
+            if jumlah <= 0:
+                st.error("Jumlah pemasukan harus lebih dari 0.")
+                return
+            waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
+            data = {"Tanggal": waktu, "Sumber": sumber, "Jumlah": jumlah, "Metode": metode}
+            append_data(data, "pemasukan.csv")
+            akun_debit = "Kas" if metode == "Tunai" else "Bank"
+            jurnal = buat_jurnal(waktu, akun_debit, "Pendapatan", jumlah, sumber)
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------- Pengeluaran ----------
+@st.fragment
 def pengeluaran():
     st.subheader("💸 Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal pengeluaran")
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("📦 Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("🔽 Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("💵 Jumlah (Rp)", min_value=0, step=1000, help="Masukkan jumlah pengeluaran")
-    deskripsi = st.text_area("📝 Keterangan (opsional)", placeholder="Deskripsikan pengeluaran")
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah pengeluaran harus lebih dari 0.")
-            return
-        waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
-        data = {"Tanggal": waktu, "Kategori": kategori, "Sub Kategori": sub_kategori, "Jumlah": jumlah, "Keterangan": deskripsi}
-        append_data(data, "pengeluaran.csv")
-
-        # Penentuan akun debit
-        if kategori == "Alat Tani":
-            akun_debit = "Peralatan Tani"
-        elif kategori == "Tenaga Kerja":
-            akun_debit = "Beban Gaji"
-        elif kategori == "Lainnya":
-            if sub_kategori == "Penyusutan":
-                akun_debit = "Beban Penyusutan"
-            elif sub_kategori == "Perlengkapan":
-                akun_debit = "Perlengkapan"
-            elif sub_kategori == "Sewa Traktor":
-                akun_debit = "Beban Sewa Traktor"
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal pengeluaran")
+        sub_kategori = st.selectbox("🔽 Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = st.number_input("💵 Jumlah (Rp)", min_value=0, step=1000, help="Masukkan jumlah pengeluaran")
+        deskripsi = st.text_area("📝 Keterangan (opsional)", placeholder="Deskripsikan pengeluaran")
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah pengeluaran harus lebih dari 0.")
+                return
+            waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
+            data = {"Tanggal": waktu, "Kategori": kategori, "Sub Kategori": sub_kategori, "Jumlah": jumlah, "Keterangan": deskripsi}
+            append_data(data, "pengeluaran.csv")
+
+            # Penentuan akun debit
+            if kategori == "Alat Tani":
+                akun_debit = "Peralatan Tani"
+            elif kategori == "Tenaga Kerja":
+                akun_debit = "Beban Gaji"
+            elif kategori == "Lainnya":
+                if sub_kategori == "Penyusutan":
+                    akun_debit = "Beban Penyusutan"
+                elif sub_kategori == "Perlengkapan":
+                    akun_debit = "Perlengkapan"
+                elif sub_kategori == "Sewa Traktor":
+                    akun_debit = "Beban Sewa Traktor"
+                else:
+                    akun_debit = f"Biaya - {sub_kategori}"
             else:
                 akun_debit = f"Biaya - {sub_kategori}"
-        else:
-            akun_debit = f"Biaya - {sub_kategori}"
 
-        akun_kredit = "Kas"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi or f"Pengeluaran {sub_kategori}")
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-        st.success("✅ Pengeluaran berhasil disimpan.")
+            akun_kredit = "Kas"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi or f"Pengeluaran {sub_kategori}")
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------- Piutang ----------
+@st.fragment
 def piutang():
     st.subheader("📄 Tambah Piutang")
-    tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal piutang")
-    pelanggan = st.text_input("👥 Nama Pelanggan", placeholder="Nama pelanggan")
-    jumlah = st.number_input("💵 Jumlah Piutang", min_value=0, step=1000, help="Masukkan jumlah piutang")
-    keterangan = st.text_area("📝 Keterangan", placeholder="Deskripsi piutang (opsional)")
-    if st.button("✅ Simpan Piutang"):
-        if not pelanggan.strip():
-            st.error("Nama pelanggan tidak boleh kosong.")
-            return
-        if jumlah <= 0:
-            st.error("Jumlah piutang harus lebih dari 0.")
-            return
-        waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
-        data = {"Tanggal": waktu, "Pelanggan": pelanggan, "Jumlah": jumlah, "Keterangan": keterangan}
-        append_data(data, "piutang.csv")
-
-        jurnal = buat_jurnal(waktu, "Piutang Dagang", "Pendapatan", jumlah, keterangan or f"Piutang dari {pelanggan}")
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-        st.success("✅ Piutang berhasil dicatat.")
+    with st.form("form_piutang", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now(), help="Pilih tanggal piutang")
+        pelanggan = st.text_input("👥 Nama Pelanggan", placeholder="Nama pelanggan")
+        jumlah = st.number_input("💵 Jumlah Piutang", min_value=0, step=1000, help="Masukkan jumlah piutang")
+        keterangan = st.text_area("📝 Keterangan", placeholder="Deskripsi piutang (opsional)")
+
+        if st.form_submit_button("✅ Simpan Piutang"):
+            if not pelanggan.strip():
+                st.error("Nama pelanggan tidak boleh kosong.")
+                return
+            if jumlah <= 0:
+                st.error("Jumlah piutang harus lebih dari 0.")
+                return
+            waktu = datetime.combine(tanggal, datetime.now().time()).strftime("%Y-%m-%d %H:%M:%S")
+            data = {"Tanggal": waktu, "Pelanggan": pelanggan, "Jumlah": jumlah, "Keterangan": keterangan}
+            append_data(data, "piutang.csv")
+
+            jurnal = buat_jurnal(waktu, "Piutang Dagang", "Pendapatan", jumlah, keterangan or f"Piutang dari {pelanggan}")
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+            st.success("✅ Piutang berhasil dicatat.")
 
 # ---------- Laporan ----------
 def laporan():
@@ -209,18 +223,18 @@ def laporan():
 
     with tabs[1]:
         st.metric("Total Pemasukan", format_rp(pemasukan_df['Jumlah'].sum()))
-        st.dataframe(pemasukan_df.style.format({"Jumlah": "{:,.0f}"}))
+        st.dataframe(pemasukan_df, column_config=kolom_rp("Jumlah"))
 
     with tabs[2]:
         st.metric("Total Pengeluaran", format_rp(pengeluaran_df['Jumlah'].sum()))
-        st.dataframe(pengeluaran_df.style.format({"Jumlah": "{:,.0f}"}))
+        st.dataframe(pengeluaran_df, column_config=kolom_rp("Jumlah"))
 
     with tabs[3]:
         st.metric("Total Piutang", format_rp(piutang_df['Jumlah'].sum()))
-        st.dataframe(piutang_df.style.format({"Jumlah": "{:,.0f}"}))
+        st.dataframe(piutang_df, column_config=kolom_rp("Jumlah"))
 
     with tabs[4]:
-        st.dataframe(jurnal_df.style.format({"Debit": "{:,.0f}", "Kredit": "{:,.0f}"}))
+        st.dataframe(jurnal_df, column_config=kolom_rp("Debit", "Kredit"))
 
     with tabs[5]:
         if not jurnal_df.empty:
@@ -230,7 +244,7 @@ def laporan():
                 df_akun = df_akun.sort_values("Tanggal")
                 df_akun["Saldo"] = (df_akun["Debit"] - df_akun["Kredit"]).cumsum()
                 st.subheader(f"📘 Buku Besar: {akun}")
-                st.dataframe(df_akun.style.format({"Debit": "{:,.0f}", "Kredit": "{:,.0f}", "Saldo": "{:,.0f}"}))
+                st.dataframe(df_akun, column_config=kolom_rp("Debit", "Kredit", "Saldo"))
         else:
             st.info("Belum ada data jurnal.")
 
@@ -1,10 +1,289 @@
+import time
+WAKTU_MULAI = time.perf_counter()  # titik awal pengukuran waktu sampai halaman login tampil
 import streamlit as st
 from datetime import datetime
 import os
+import csv
 import hashlib
+import hmac
+import json
+import glob
+import re
+import queue
+import threading
+import logging
+from collections import OrderedDict
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
-import plotly.express as px 
-import base64
+import io
+
+from sipadi_core import (
+    FORMAT_TANGGAL, KOLOM_TABEL, KOLOM_INTEGER,
+    kenalkan, kodekan, cocok_kategori, nama_tabel, empty_df, parse_tanggal, terapkan_skema,
+    rupiah, format_rupiah, baca_csv, format_tanggal, urutkan_tanggal, rentang_tanggal, potong_tanggal,
+    tulis_cookie_sesi, mulai_sesi, pulihkan_sesi, akhiri_sesi, muat_plotly, panaskan_impor,
+    get_manajer_aset,
+    get_kunci_posting, file_sementara, cari_unik, baca_header, siapkan_baris,
+    pulihkan_pending, pulihkan_folder, commit_posting,
+)
+
+# ==================== SCHEMA REGISTRY ====================
+# Skema tabel dan pembacaannya ada di sipadi_core.py, dipakai bersama hebat.py dan c.py.
+def kolom_rupiah(*kolom):
+    # Pemisah ribuan digambar browser lewat column_config; data yang dikirim tetap int64 apa adanya
+    return {k: st.column_config.NumberColumn(f"{k} (Rp)", format="localized") for k in kolom}
+
+# ==================== STORAGE BACKEND ====================
+# "csv" (default) menyimpan tiap tabel di data/<tabel>_<user>.csv,
+# "sqlite" menyimpan semua tabel di satu file data/sipadi.db,
+# "parquet" menyimpan jurnal di data/jurnal_<user>/tahun=YYYY/bulan=MM/ (butuh pyarrow)
+STORAGE_BACKEND = os.environ.get("SIPADI_STORAGE", "csv")
+DB_FILE = "data/sipadi.db"
+
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.float64, float)
+
+def kutip(kolom):
+    return '"' + kolom.replace('"', '""') + '"'
+
+def buat_skema(conn):
+    for tabel, kolom in KOLOM_TABEL.items():
+        if "Username" not in kolom:
+            kolom = kolom + ["Username"]
+        definisi = ", ".join(f"{kutip(k)} {'INTEGER' if k in KOLOM_INTEGER else 'TEXT'}" for k in kolom)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {tabel} ({definisi})")
+        if "Tanggal" in kolom:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabel}_user_tanggal ON {tabel} (Username, Tanggal)")
+        if "Akun" in kolom:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabel}_user_akun_tanggal ON {tabel} (Username, Akun, Tanggal)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_akun_username ON akun (Username)")
+    ada_saldo = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'saldo'").fetchone()
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS saldo (Username TEXT, Akun TEXT, Debit INTEGER, Kredit INTEGER, "
+        "PRIMARY KEY (Username, Akun))"
+    )
+    if not ada_saldo:
+        # Database lama belum punya tabel saldo, isi sekali dari jurnal yang sudah ada
+        conn.execute(
+            "INSERT INTO saldo SELECT Username, Akun, SUM(Debit), SUM(Kredit) FROM jurnal GROUP BY Username, Akun"
+        )
+    conn.commit()
+
+class PoolKoneksi:
+    # Koneksi SQLite dipakai bergantian oleh semua sesi Streamlit dalam satu proses
+    def __init__(self, path, ukuran=4):
+        self.antrean = queue.Queue()
+        for _ in range(ukuran):
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self.antrean.put(conn)
+
+    @contextmanager
+    def pinjam(self):
+        conn = self.antrean.get()
+        try:
+            yield conn
+        finally:
+            self.antrean.put(conn)
+
+@st.cache_resource
+def get_pool():
+    os.makedirs("data", exist_ok=True)
+    pool = PoolKoneksi(DB_FILE)
+    with pool.pinjam() as conn:
+        buat_skema(conn)
+    return pool
+
+def load_data_sqlite(base_filename, username, mulai=None, akhir=None):
+    tabel = nama_tabel(base_filename)
+    if tabel not in KOLOM_TABEL:
+        return pd.DataFrame()
+    kolom = KOLOM_TABEL[tabel]
+    syarat, params = ["Username = ?"], [username]
+    awal, batas = rentang_tanggal(mulai, akhir)
+    if awal is not None:
+        syarat.append("Tanggal >= ?")
+        params.append(awal.strftime(FORMAT_TANGGAL))
+    if batas is not None:
+        syarat.append("Tanggal < ?")
+        params.append(batas.strftime(FORMAT_TANGGAL))
+    # Tanggal NULL diletakkan di akhir, sama seperti urutkan_tanggal pada backend file
+    sql = (
+        f"SELECT {', '.join(kutip(k) for k in kolom)} FROM {tabel} WHERE {' AND '.join(syarat)} "
+        "ORDER BY Tanggal IS NULL, Tanggal, rowid"
+    )
+    with get_pool().pinjam() as conn:
+        return terapkan_skema(pd.read_sql_query(sql, conn, params=params), tabel)
+
+def insert_sqlite(baris_per_tabel, username, hapus_dulu=()):
+    # Semua tabel ditulis dalam satu transaksi, jadi hanya satu commit (fsync) per posting
+    with get_pool().pinjam() as conn:
+        with conn:
+            for tabel in hapus_dulu:
+                conn.execute(f"DELETE FROM {tabel} WHERE Username = ?", (username,))
+            for base_filename, rows in baris_per_tabel.items():
+                tabel = nama_tabel(base_filename)
+                kolom = KOLOM_TABEL[tabel]
+                if "Username" not in kolom:
+                    kolom = kolom + ["Username"]
+                nilai = [
+                    tuple(username if k == "Username" else row.get(k) for k in kolom)
+                    for row in rows
+                ]
+                placeholder = ", ".join("?" for _ in kolom)
+                conn.executemany(
+                    f"INSERT INTO {tabel} ({', '.join(kutip(k) for k in kolom)}) VALUES ({placeholder})",
+                    nilai,
+                )
+                if tabel == "jurnal" and "jurnal" not in hapus_dulu:
+                    perbarui_saldo_sqlite(conn, username, rows)
+            if "jurnal" in hapus_dulu:
+                conn.execute("DELETE FROM saldo WHERE Username = ?", (username,))
+                conn.execute(
+                    "INSERT INTO saldo SELECT Username, Akun, SUM(Debit), SUM(Kredit) FROM jurnal "
+                    "WHERE Username = ? GROUP BY Akun",
+                    (username,),
+                )
+
+def perbarui_saldo_sqlite(conn, username, rows):
+    conn.executemany(
+        "INSERT INTO saldo (Username, Akun, Debit, Kredit) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (Username, Akun) DO UPDATE SET "
+        "Debit = Debit + excluded.Debit, Kredit = Kredit + excluded.Kredit",
+        [(username, r["Akun"], int(r["Debit"]), int(r["Kredit"])) for r in rows],
+    )
+
+def save_data_sqlite(df, base_filename, username):
+    df = format_tanggal(df)
+    rows = df.astype(object).where(df.notna(), None).to_dict("records")
+    insert_sqlite({base_filename: rows}, username, hapus_dulu=[nama_tabel(base_filename)])
+
+# ==================== PARQUET JOURNAL STORE ====================
+def pakai_parquet(base_filename):
+    return STORAGE_BACKEND == "parquet" and nama_tabel(base_filename) == "jurnal"
+
+def file_partisi(username, tahun, bulan):
+    folder = get_user_file("jurnal", username)
+    return os.path.join(folder, f"tahun={tahun}", f"bulan={bulan:02d}", "jurnal.parquet")
+
+def daftar_partisi(username):
+    pola = os.path.join(get_user_file("jurnal", username), "tahun=*", "bulan=*", "jurnal.parquet")
+    for path in sorted(glob.glob(pola)):
+        cocok = re.search(r"tahun=(\d+)[\\/]bulan=(\d+)", path)
+        yield int(cocok.group(1)), int(cocok.group(2)), path
+
+def siapkan_parquet(rows, username):
+    # Tiap bulan yang tersentuh ditulis ulang ke file sementara; os.replace dilakukan saat commit
+    df_baru = pd.DataFrame(rows).reindex(columns=KOLOM_TABEL["jurnal"])
+    df_baru["Tanggal"] = pd.to_datetime(df_baru["Tanggal"], format=FORMAT_TANGGAL)
+    ganti = []
+    kunci = [df_baru["Tanggal"].dt.year, df_baru["Tanggal"].dt.month]
+    for (tahun, bulan), bagian in df_baru.groupby(kunci):
+        target = file_partisi(username, tahun, bulan)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            bagian = pd.concat([pd.read_parquet(target), bagian], ignore_index=True)
+        bagian["Akun"] = bagian["Akun"].astype(str)
+        bagian["Keterangan"] = bagian["Keterangan"].fillna("").astype(str)
+        tmp = file_sementara(target)
+        bagian.to_parquet(tmp, index=False)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        ganti.append([tmp, target])
+    return ganti
+
+def load_jurnal_parquet(username, mulai=None, akhir=None):
+    awal, batas = rentang_tanggal(mulai, akhir)
+    bagian = []
+    for tahun, bulan, path in daftar_partisi(username):
+        periode = pd.Period(year=tahun, month=bulan, freq="M")
+        if awal is not None and periode.end_time < awal:
+            continue
+        if batas is not None and periode.start_time >= batas:
+            continue
+        bagian.append(pd.read_parquet(path, columns=KOLOM_TABEL["jurnal"]))
+    if not bagian:
+        return empty_df("jurnal")
+    df = urutkan_tanggal(terapkan_skema(pd.concat(bagian, ignore_index=True), "jurnal"))
+    return potong_tanggal(df, mulai, akhir).reset_index(drop=True)
+
+def save_jurnal_parquet(df, username):
+    # Di bawah kunci posting, agar file sementaranya tidak ikut disapu posting lain
+    with get_kunci_posting(username):
+        for _, _, path in list(daftar_partisi(username)):
+            os.remove(path)
+        ganti = siapkan_parquet(df.to_dict("records"), username) if not df.empty else []
+        for tmp, target in ganti:
+            os.replace(tmp, target)
+
+# ==================== DATA CACHE ====================
+# Tabel yang sudah dibaca disimpan sekali per proses dan dipakai bersama semua sesi.
+# Kunci versinya adalah (file, mtime, ukuran), jadi perubahan dari luar tetap terbaca.
+CACHE_MAKS_BYTES = int(os.environ.get("SIPADI_CACHE_MB", "256")) * 1024 * 1024
+
+class CacheData:
+    def __init__(self, maks_bytes):
+        self.maks_bytes = maks_bytes
+        self.isi = OrderedDict()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def ambil(self, kunci, versi):
+        with self.lock:
+            entri = self.isi.get(kunci)
+            if entri is None or entri[0] != versi:
+                return None
+            self.isi.move_to_end(kunci)
+            return entri[1]
+
+    def simpan(self, kunci, versi, df, ukuran=None):
+        if ukuran is None:
+            ukuran = int(df.memory_usage(deep=True).sum())
+        with self.lock:
+            self._buang(kunci)
+            if ukuran > self.maks_bytes:
+                return
+            self.isi[kunci] = (versi, df, ukuran)
+            self.total += ukuran
+            while self.total > self.maks_bytes:
+                self._buang(next(iter(self.isi)))
+
+    def hapus(self, kunci):
+        with self.lock:
+            self._buang(kunci)
+
+    def _buang(self, kunci):
+        entri = self.isi.pop(kunci, None)
+        if entri is not None:
+            self.total -= entri[2]
+
+@st.cache_resource
+def get_cache():
+    return CacheData(CACHE_MAKS_BYTES)
+
+def cap_file(path):
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (path, info.st_mtime_ns, info.st_size)
+
+def versi_data(base_filename, username):
+    if STORAGE_BACKEND == "sqlite":
+        return (cap_file(DB_FILE), cap_file(DB_FILE + "-wal"))
+    if pakai_parquet(base_filename):
+        return tuple(cap_file(path) for _, _, path in daftar_partisi(username))
+    return cap_file(get_user_file(base_filename, username))
+
+def kunci_cache(base_filename, username):
+    return (STORAGE_BACKEND, nama_tabel(base_filename), username)
+
+def invalidasi_cache(base_filename, username):
+    get_cache().hapus(kunci_cache(base_filename, username))
 
 # ==================== HELPER FUNCTIONS ====================
 def hash_password(password):
@@ -17,70 +296,793 @@ def get_user_file(base_filename, username):
     return f"data/{name}_{username}{ext}"
 
 def load_data(base_filename, username):
+    if STORAGE_BACKEND != "sqlite":
+        pulihkan_posting(username)
+    kunci = kunci_cache(base_filename, username)
+    versi = versi_data(base_filename, username)
+    df = get_cache().ambil(kunci, versi)
+    if df is None:
+        df = baca_tabel(base_filename, username)
+        get_cache().simpan(kunci, versi, df)
+    # Salinan dangkal agar kolom yang diganti pemanggil tidak mengubah isi cache
+    return df.copy(deep=False)
+
+def baca_tabel(base_filename, username):
+    if STORAGE_BACKEND == "sqlite":
+        return load_data_sqlite(base_filename, username)
+    if pakai_parquet(base_filename):
+        return load_jurnal_parquet(username)
     filename = get_user_file(base_filename, username)
     if os.path.exists(filename):
-        try:
-            return pd.read_csv(filename)
-        except pd.errors.EmptyDataError:
-            if "pemasukan" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Sumber", "Jumlah", "Metode", "Keterangan", "Username"])
-            elif "pengeluaran" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Kategori", "Sub Kategori", "Jumlah", "Keterangan", "Metode", "Username"])
-            elif "jurnal" in filename:
-                return pd.DataFrame(columns=["Tanggal", "Akun", "Debit", "Kredit", "Keterangan"])
-            else:
-                return pd.DataFrame()
-    else:
-        if "pemasukan" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Sumber", "Jumlah", "Metode", "Keterangan", "Username"])
-        elif "pengeluaran" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Kategori", "Sub Kategori", "Jumlah", "Keterangan", "Metode", "Username"])
-        elif "jurnal" in base_filename:
-            return pd.DataFrame(columns=["Tanggal", "Akun", "Debit", "Kredit", "Keterangan"])
-        else:
-            return pd.DataFrame()
+        return urutkan_tanggal(baca_csv(filename, nama_tabel(base_filename)))
+    return empty_df(nama_tabel(base_filename))
 
 def save_data(df, base_filename, username):
+    invalidasi_cache(base_filename, username)
+    if STORAGE_BACKEND == "sqlite":
+        return save_data_sqlite(df, base_filename, username)
+    if nama_tabel(base_filename) in DIMENSI_ROLLUP and os.path.exists(file_versi_ringkasan(username)):
+        # Saldo dan rollup dihitung ulang dari tabel baru saat dibutuhkan
+        os.remove(file_versi_ringkasan(username))
+    if pakai_parquet(base_filename):
+        return save_jurnal_parquet(df, username)
     filename = get_user_file(base_filename, username)
-    df.to_csv(filename, index=False)
+    df.to_csv(filename, index=False, date_format=FORMAT_TANGGAL)
 
-def append_data(data, base_filename, username):
+def folder_posting(username):
+    return get_user_file("posting", username)
+
+def pulihkan_posting(username, sapu=False):
+    # Penanda dari versi sebelum folder per user (data/posting_<user>.pending dan
+    # data/posting_<user>.<pid>-<hex>.pending) ikut dipulihkan. Dengan sapu=True,
+    # file sementara yatim milik user dibuang sebelum posting baru menyiapkan miliknya.
+    folder = folder_posting(username)
+    sementara = []
+    if sapu:
+        sementara = [file_saldo(username), dir_rollup(username)]
+        sementara += [get_user_file(f"{tabel}.csv", username) for tabel in DIMENSI_ROLLUP]
+        sementara += [os.path.dirname(path) for _, _, path in daftar_partisi(username)]
+    with get_kunci_posting(username):
+        lama = [f"{folder}.pending"] if os.path.exists(f"{folder}.pending") else []
+        for pending in lama + cari_unik(folder, "pending"):
+            pulihkan_pending(pending)
+        pulihkan_folder(folder, username, sementara)
+
+def posting_jurnal(jurnal, dokumen, base_dokumen, username):
+    # Dokumen sumber dan semua baris jurnalnya disimpan bersama dalam satu commit.
+    # Jurnal tanpa dokumen sumber (mis. hasil impor) dikirim dengan dokumen=None.
+    if sum(j["Debit"] for j in jurnal) != sum(j["Kredit"] for j in jurnal):
+        raise ValueError("Jurnal tidak seimbang: total debit dan kredit berbeda.")
+    if dokumen is not None:
+        invalidasi_cache(base_dokumen, username)
+    invalidasi_cache("jurnal.csv", username)
+    if STORAGE_BACKEND == "sqlite":
+        versi_lama = versi_indeks(username)
+        baris = {"jurnal.csv": jurnal} if dokumen is None else {base_dokumen: [dokumen], "jurnal.csv": jurnal}
+        insert_sqlite(baris, username)
+        return perbarui_indeks_saldo(username, jurnal, versi_lama)
+    with get_kunci_posting(username):
+        posting_jurnal_file(jurnal, dokumen, base_dokumen, username)
+
+def file_ledger(base_filename, username):
+    return get_user_file(base_filename, username), KOLOM_TABEL[nama_tabel(base_filename)]
+
+def posting_jurnal_file(jurnal, dokumen, base_dokumen, username):
+    # Saldo dan rollup tidak di-fsync: keduanya turunan ledger, dibangun ulang bila
+    # terpotong atau tidak cocok dengan catatan versi sumber (segarkan_ringkasan)
+    pulihkan_posting(username, sapu=True)
+    versi_lama = versi_indeks(username)
+    saldo = tambah_saldo(load_saldo(username), jurnal)
+    # Hanya bulan yang disentuh posting ini yang dibaca dan ditulis ulang
+    rollup = load_rollup(username, bulan_baris(jurnal if dokumen is None else jurnal + [dokumen]))
+    tulisan = []
+    if dokumen is not None:
+        tambah_rollup(rollup, nama_tabel(base_dokumen), [dokumen])
+        tulisan.append(siapkan_baris([dokumen], *file_ledger(base_dokumen, username)))
+    tambah_rollup(rollup, "jurnal", jurnal)
+    ganti = []
+    if pakai_parquet("jurnal.csv"):
+        ganti = siapkan_parquet(jurnal, username)
+    else:
+        tulisan.append(siapkan_baris(jurnal, *file_ledger("jurnal.csv", username)))
+    # Partisi parquet adalah data utama, jadi hasil os.replace-nya harus awet
+    folder_awet = {os.path.dirname(target) for _, target in ganti}
+    ganti.append(siapkan_saldo(saldo, username))
+    ganti.extend(siapkan_rollup(rollup, username))
+    commit_posting(folder_posting(username), tulisan, ganti, folder_awet)
+    catat_versi_sumber(username)
+    perbarui_indeks_saldo(username, jurnal, versi_lama)
+
+def load_data_periode(base_filename, username, mulai=None, akhir=None):
+    # Hanya baris dalam rentang tanggal yang diminta
+    if STORAGE_BACKEND == "sqlite":
+        return load_data_sqlite(base_filename, username, mulai, akhir)
+    if pakai_parquet(base_filename):
+        pulihkan_posting(username)
+        return load_jurnal_parquet(username, mulai, akhir)
     df = load_data(base_filename, username)
-    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-    save_data(df, base_filename, username)
+    # Cache menyimpan tabel urut Tanggal, jadi rentang cukup dicari dengan binary search
+    return potong_tanggal(df, mulai, akhir)
 
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan):
+    jumlah = rupiah(jumlah)
     return [
         {"Tanggal": tanggal, "Akun": akun_debit, "Debit": jumlah, "Kredit": 0, "Keterangan": keterangan},
         {"Tanggal": tanggal, "Akun": akun_kredit, "Debit": 0, "Kredit": jumlah, "Keterangan": keterangan},
     ]
 
-def load_user_accounts():
-    if os.path.exists("data/akun.csv"):
-        return pd.read_csv("data/akun.csv")
-    else:
-        return pd.DataFrame(columns=["Username", "Password"])
+# ==================== AKUN PENGGUNA ====================
+# Username -> hash password disimpan di memori sekali per proses, jadi login
+# cukup satu lookup dict. data/akun.csv diperlakukan sebagai log yang hanya
+# ditambah: pendaftaran menulis satu baris, dan indeks hanya membaca byte baru
+# sejak posisi terakhir. Untuk SQLite posisinya adalah rowid terakhir.
+AKUN_FILE = "data/akun.csv"
+
+class IndeksAkun:
+    def __init__(self):
+        self.sandi = {}
+        self.posisi = 0
+        self.header = None
+        self.identitas = None
+        self.lock = threading.Lock()
+
+    def cari(self, username):
+        with self.lock:
+            self.sinkron()
+            return self.sandi.get(username)
+
+    def daftar(self, username, sandi):
+        with self.lock:
+            self.sinkron()
+            if username in self.sandi:
+                return False
+            if STORAGE_BACKEND == "sqlite":
+                try:
+                    with get_pool().pinjam() as conn:
+                        with conn:
+                            conn.execute("INSERT INTO akun (Username, Password) VALUES (?, ?)", (username, sandi))
+                except sqlite3.IntegrityError:
+                    return False
+            else:
+                tambah_baris_akun(username, sandi)
+            self.sinkron()
+            return True
+
+    def sinkron(self):
+        if STORAGE_BACKEND == "sqlite":
+            self.sinkron_sqlite()
+        else:
+            self.sinkron_csv()
 
-def save_user_accounts(df):
+    def sinkron_sqlite(self):
+        with get_pool().pinjam() as conn:
+            baris = conn.execute(
+                "SELECT rowid, Username, Password FROM akun WHERE rowid > ? ORDER BY rowid", (self.posisi,)
+            ).fetchall()
+        for rowid, username, sandi in baris:
+            self.sandi[username] = sandi
+            self.posisi = rowid
+
+    def sinkron_csv(self):
+        try:
+            info = os.stat(AKUN_FILE)
+        except FileNotFoundError:
+            info = None
+        identitas = None if info is None else (info.st_dev, info.st_ino)
+        if identitas != self.identitas or (info is not None and info.st_size < self.posisi):
+            # File baru, diganti, atau dipotong: baca ulang dari awal
+            self.sandi, self.posisi, self.header, self.identitas = {}, 0, None, identitas
+        if info is None or info.st_size == self.posisi:
+            return
+        with open(AKUN_FILE, "rb") as f:
+            f.seek(self.posisi)
+            data = f.read()
+        # Baris terakhir yang belum selesai ditulis ditunda sampai sinkron berikutnya
+        selesai = data.rfind(b"\n") + 1
+        if selesai == 0:
+            return
+        baris = csv.reader(io.StringIO(data[:selesai].decode("utf-8"), newline=""))
+        if self.header is None:
+            self.header = next(baris, [])
+        i_user, i_sandi = self.header.index("Username"), self.header.index("Password")
+        for row in baris:
+            if len(row) > max(i_user, i_sandi):
+                self.sandi[row[i_user]] = row[i_sandi]
+        self.posisi += selesai
+
+def tambah_baris_akun(username, sandi):
     os.makedirs("data", exist_ok=True)
-    df.to_csv("data/akun.csv", index=False)
+    teks = io.StringIO()
+    penulis = csv.writer(teks, lineterminator="\n")
+    if os.path.exists(AKUN_FILE) and os.path.getsize(AKUN_FILE) > 0:
+        header = baca_header(AKUN_FILE)
+        with open(AKUN_FILE, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                teks.write("\n")
+    else:
+        header = KOLOM_TABEL["akun"]
+        penulis.writerow(header)
+    nilai = {"Username": username, "Password": sandi}
+    penulis.writerow([nilai.get(k, "") for k in header])
+    with open(AKUN_FILE, "a", newline="", encoding="utf-8") as f:
+        f.write(teks.getvalue())
+
+@st.cache_resource
+def get_indeks_akun():
+    return IndeksAkun()
 
 def register_user(username, password):
-    akun_df = load_user_accounts()
-    if (akun_df['Username'] == username).any():
-        return False
-    akun_df = pd.concat([akun_df, pd.DataFrame([{"Username": username, "Password": hash_password(password)}])], ignore_index=True)
-    save_user_accounts(akun_df)
-    return True
+    return get_indeks_akun().daftar(username, hash_password(password))
 
 def validate_login(username, password):
-    akun_df = load_user_accounts()
-    hashed_pw = hash_password(password)
-    return ((akun_df['Username'] == username) & (akun_df['Password'] == hashed_pw)).any()
+    tersimpan = get_indeks_akun().cari(username)
+    return tersimpan is not None and hmac.compare_digest(tersimpan, hash_password(password))
+
+# ==================== SESI LOGIN ====================
+# Token sesi disimpan di cookie dan dicek ke tabel sesi di memori; lihat sipadi_core.py.
+COOKIE_SESI = "sipadi_sesi"
+
+# ==================== SALDO AKUN ====================
+# Total debit dan kredit per akun dirawat setiap kali jurnal diposting,
+# sehingga laporan seluruh periode tidak perlu memindai jurnal mentah.
+# Untuk backend file disimpan di data/saldo_<user>.json, untuk SQLite di tabel saldo.
+# Versi tabel sumber saat saldo dan rollup terakhir diperbarui dicatat di
+# data/ringkasan_<user>.json; jika berbeda (file diubah di luar aplikasi), keduanya dibangun ulang.
+def file_saldo(username):
+    return get_user_file("saldo.json", username)
+
+def file_versi_ringkasan(username):
+    return get_user_file("ringkasan.json", username)
+
+def versi_sumber(username):
+    # Dalam bentuk yang sama dengan hasil json.load, jadi bisa dibandingkan langsung
+    return json.loads(json.dumps({tabel: versi_data(f"{tabel}.csv", username) for tabel in DIMENSI_ROLLUP}))
+
+def catat_versi_sumber(username):
+    # Ditulis langsung: catatan yang terpotong gagal dibaca dan hanya memicu bangun ulang
+    with open(file_versi_ringkasan(username), "w", encoding="utf-8") as f:
+        json.dump(versi_sumber(username), f)
+
+def hitung_ulang_ringkasan(username):
+    # Saldo dan rollup dibangun ulang bersama dari tabel sumber
+    if STORAGE_BACKEND == "sqlite":
+        return rebuild_saldo(username)
+    with get_kunci_posting(username):
+        rebuild_saldo(username)
+        rebuild_rollup(username)
+        catat_versi_sumber(username)
+
+def segarkan_ringkasan(username):
+    with get_kunci_posting(username):
+        pulihkan_posting(username)
+        try:
+            with open(file_versi_ringkasan(username), encoding="utf-8") as f:
+                tercatat = json.load(f)
+        except (FileNotFoundError, ValueError):
+            tercatat = None
+        if tercatat != versi_sumber(username):
+            hitung_ulang_ringkasan(username)
+
+def hitung_saldo(jurnal_df):
+    saldo = {"akun": {}, "awal": None, "akhir": None}
+    if jurnal_df.empty:
+        return saldo
+    total = jurnal_df.groupby("Akun", observed=True)[["Debit", "Kredit"]].sum()
+    saldo["akun"] = {str(akun): {"Debit": int(b["Debit"]), "Kredit": int(b["Kredit"])} for akun, b in total.iterrows()}
+    tanggal = jurnal_df["Tanggal"].dropna()
+    if not tanggal.empty:
+        saldo["awal"] = tanggal.min().strftime(FORMAT_TANGGAL)
+        saldo["akhir"] = tanggal.max().strftime(FORMAT_TANGGAL)
+    return saldo
+
+def tanggal_baris(rows):
+    # Tanggal semua baris diurai sekaligus
+    return parse_tanggal(pd.Series([r["Tanggal"] for r in rows], dtype=object))
+
+def tambah_saldo(saldo, rows):
+    for r in rows:
+        total = saldo["akun"].setdefault(str(r["Akun"]), {"Debit": 0, "Kredit": 0})
+        total["Debit"] += int(r["Debit"])
+        total["Kredit"] += int(r["Kredit"])
+    tanggal = tanggal_baris(rows).dropna()
+    if not tanggal.empty:
+        awal, akhir = tanggal.min().strftime(FORMAT_TANGGAL), tanggal.max().strftime(FORMAT_TANGGAL)
+        if saldo["awal"] is None or awal < saldo["awal"]:
+            saldo["awal"] = awal
+        if saldo["akhir"] is None or akhir > saldo["akhir"]:
+            saldo["akhir"] = akhir
+    return saldo
+
+def siapkan_saldo(saldo, username):
+    # Ditulis ke file sementara dulu; os.replace ikut titik commit posting
+    target = file_saldo(username)
+    tmp = file_sementara(target)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saldo, f)
+    return [tmp, target]
+
+def load_saldo(username):
+    if STORAGE_BACKEND == "sqlite":
+        with get_pool().pinjam() as conn:
+            baris = conn.execute("SELECT Akun, Debit, Kredit FROM saldo WHERE Username = ?", (username,)).fetchall()
+            awal, akhir = conn.execute(
+                "SELECT MIN(Tanggal), MAX(Tanggal) FROM jurnal WHERE Username = ?", (username,)
+            ).fetchone()
+        return {"akun": {a: {"Debit": d, "Kredit": k} for a, d, k in baris}, "awal": awal, "akhir": akhir}
+    segarkan_ringkasan(username)
+    try:
+        with open(file_saldo(username), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        # Belum ada, atau terpotong karena crash (saldo tidak di-fsync)
+        return rebuild_saldo(username)
+
+def rebuild_saldo(username):
+    # Hitung ulang dari jurnal, misalnya setelah file jurnal diubah di luar aplikasi
+    if STORAGE_BACKEND == "sqlite":
+        with get_pool().pinjam() as conn:
+            with conn:
+                conn.execute("DELETE FROM saldo WHERE Username = ?", (username,))
+                conn.execute(
+                    "INSERT INTO saldo SELECT Username, Akun, SUM(Debit), SUM(Kredit) FROM jurnal "
+                    "WHERE Username = ? GROUP BY Akun",
+                    (username,),
+                )
+        return load_saldo(username)
+    saldo = hitung_saldo(load_data("jurnal.csv", username))
+    tmp, target = siapkan_saldo(saldo, username)
+    os.replace(tmp, target)
+    return saldo
+
+def tabel_saldo(saldo):
+    df = pd.DataFrame(
+        [(akun, t["Debit"], t["Kredit"]) for akun, t in saldo["akun"].items()],
+        columns=["Akun", "Debit", "Kredit"],
+    ).astype({"Debit": "int64", "Kredit": "int64"})
+    df["Saldo"] = df["Debit"] - df["Kredit"]
+    return df
+
+def saldo_periode(username, mulai, akhir):
+    # Jika rentang mencakup seluruh jurnal, tabel saldo langsung dipakai; selain itu dari rollup
+    saldo = load_saldo(username)
+    if saldo["awal"] is None or (
+        pd.to_datetime(mulai) <= pd.to_datetime(saldo["awal"])
+        and pd.to_datetime(akhir) >= pd.to_datetime(saldo["akhir"])
+    ):
+        return tabel_saldo(saldo)
+    df = rollup_periode("jurnal", username, mulai, akhir)
+    df["Saldo"] = df["Debit"] - df["Kredit"]
+    return df
+
+# ==================== ROLLUP BULANAN & HARIAN ====================
+# Jumlah per bulan dan per hari untuk tiap kombinasi dimensi, dirawat saat menulis.
+# Rentang tanggal dijawab dari bucket bulan penuh ditambah bucket harian di tepi rentang.
+# Satu file per bulan di data/rollup_<user>/, jadi posting hanya menulis ulang bulan yang disentuh.
+DIMENSI_ROLLUP = {
+    "jurnal": (["Akun"], ["Debit", "Kredit"]),
+    "pemasukan": (["Sumber", "Metode"], ["Jumlah"]),
+    "pengeluaran": (["Kategori", "Sub Kategori", "Metode"], ["Jumlah"]),
+}
+
+def dir_rollup(username):
+    path = get_user_file("rollup", username)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def file_rollup(username, bulan):
+    return os.path.join(dir_rollup(username), f"{bulan}.json")
+
+def daftar_bulan_rollup(username):
+    return sorted(nama[:-5] for nama in os.listdir(dir_rollup(username)) if nama.endswith(".json"))
+
+def bulan_baris(rows):
+    return sorted(set(tanggal_baris(rows).dropna().dt.strftime("%Y-%m"))) if rows else []
+
+def tambah_rollup(rollup, tabel, rows):
+    dims, nilai = DIMENSI_ROLLUP[tabel]
+    bagian = rollup.setdefault(tabel, {"bulan": {}, "hari": {}})
+    if not rows:
+        return rollup
+    tanggal = tanggal_baris(rows)
+    for r, bulan, hari in zip(rows, tanggal.dt.strftime("%Y-%m"), tanggal.dt.strftime("%Y-%m-%d")):
+        if pd.isna(hari):
+            continue
+        kunci = json.dumps([str(r.get(d, "")) for d in dims])
+        for tingkat, periode in [("bulan", bulan), ("hari", hari)]:
+            bucket = bagian[tingkat].setdefault(periode, {})
+            total = bucket.setdefault(kunci, [0] * len(nilai))
+            for i, n in enumerate(nilai):
+                total[i] += int(r.get(n) or 0)
+    return rollup
+
+def hitung_rollup(username):
+    rollup = {}
+    for tabel in DIMENSI_ROLLUP:
+        df = load_data(f"{tabel}.csv", username)
+        tambah_rollup(rollup, tabel, df.to_dict("records"))
+    return rollup
+
+def pecah_bulan(rollup):
+    # {bulan: rollup yang hanya berisi bucket bulan itu dan hari-harinya}
+    per_bulan = {}
+    for tabel, bagian in rollup.items():
+        for tingkat, buckets in bagian.items():
+            for periode, bucket in buckets.items():
+                isi = per_bulan.setdefault(periode[:7], {}).setdefault(tabel, {"bulan": {}, "hari": {}})
+                isi[tingkat][periode] = bucket
+    return per_bulan
+
+def siapkan_rollup(rollup, username):
+    ganti = []
+    for bulan, isi in pecah_bulan(rollup).items():
+        target = file_rollup(username, bulan)
+        tmp = file_sementara(target)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(isi, f)
+        ganti.append([tmp, target])
+    return ganti
+
+def load_rollup(username, daftar_bulan=None):
+    # Hanya bulan yang diminta yang dibaca; None berarti semua bulan
+    segarkan_ringkasan(username)
+    rollup = {}
+    for bulan in daftar_bulan_rollup(username) if daftar_bulan is None else daftar_bulan:
+        try:
+            with open(file_rollup(username, bulan), encoding="utf-8") as f:
+                isi = json.load(f)
+        except FileNotFoundError:
+            continue
+        except ValueError:
+            # Terpotong karena crash (rollup tidak di-fsync), bangun ulang semuanya
+            return rebuild_rollup(username)
+        for tabel, bagian in isi.items():
+            gabungan = rollup.setdefault(tabel, {"bulan": {}, "hari": {}})
+            for tingkat, buckets in bagian.items():
+                gabungan[tingkat].update(buckets)
+    return rollup
+
+def rebuild_rollup(username):
+    with get_kunci_posting(username):
+        rollup = hitung_rollup(username)
+        ganti = siapkan_rollup(rollup, username)
+        for tmp, target in ganti:
+            os.replace(tmp, target)
+        baru = {target for _, target in ganti}
+        for bulan in daftar_bulan_rollup(username):
+            if file_rollup(username, bulan) not in baru:
+                os.remove(file_rollup(username, bulan))
+        lama = get_user_file("rollup.json", username)
+        if os.path.exists(lama):
+            # Rollup satu file dari versi sebelumnya
+            os.remove(lama)
+    return rollup
+
+def potong_rentang(mulai, akhir):
+    # Bulan yang seluruhnya berada di dalam rentang, dan hari-hari sisanya di tepi
+    awal = pd.Timestamp(mulai).normalize()
+    batas = pd.Timestamp(akhir).normalize()
+    bulan_penuh, hari_tepi = [], []
+    for periode in pd.period_range(awal, batas, freq="M"):
+        mulai_bulan = periode.start_time.normalize()
+        akhir_bulan = periode.end_time.normalize()
+        if mulai_bulan >= awal and akhir_bulan <= batas:
+            bulan_penuh.append(periode.strftime("%Y-%m"))
+        else:
+            hari = pd.date_range(max(mulai_bulan, awal), min(akhir_bulan, batas), freq="D")
+            hari_tepi.extend(hari.strftime("%Y-%m-%d"))
+    return bulan_penuh, hari_tepi
+
+def rollup_periode(tabel, username, mulai, akhir):
+    # Total per dimensi dalam rentang tanggal (inklusif per hari)
+    dims, nilai = DIMENSI_ROLLUP[tabel]
+    if STORAGE_BACKEND == "sqlite":
+        kolom_dims = ", ".join(kutip(d) for d in dims)
+        kolom_nilai = ", ".join(f"SUM({kutip(n)}) AS {kutip(n)}" for n in nilai)
+        sql = (
+            f"SELECT {kolom_dims}, {kolom_nilai} FROM {tabel} "
+            f"WHERE Username = ? AND Tanggal >= ? AND Tanggal < ? GROUP BY {kolom_dims}"
+        )
+        awal, batas = rentang_tanggal(mulai, akhir)
+        params = [username, awal.strftime(FORMAT_TANGGAL), batas.strftime(FORMAT_TANGGAL)]
+        with get_pool().pinjam() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return df.astype({n: "int64" for n in nilai})
+    bulan_penuh, hari_tepi = potong_rentang(mulai, akhir)
+    bulan_tepi = sorted({h[:7] for h in hari_tepi})
+    bagian = load_rollup(username, bulan_penuh + bulan_tepi).get(tabel, {"bulan": {}, "hari": {}})
+    total = {}
+    buckets = [bagian["bulan"].get(b, {}) for b in bulan_penuh] + [bagian["hari"].get(h, {}) for h in hari_tepi]
+    for bucket in buckets:
+        for kunci, jumlah in bucket.items():
+            akumulasi = total.setdefault(kunci, [0] * len(nilai))
+            for i, j in enumerate(jumlah):
+                akumulasi[i] += j
+    baris = [json.loads(kunci) + jumlah for kunci, jumlah in total.items()]
+    return pd.DataFrame(baris, columns=dims + nilai).astype({n: "int64" for n in nilai})
+
+# ==================== SALDO PER TANGGAL ====================
+# Fenwick tree per akun di atas bucket harian (posisi 1 = hari `dasar`).
+# Menambah baris bertanggal mundur dan menanyakan saldo s.d. tanggal X sama-sama O(log n).
+class IndeksSaldo:
+    CADANGAN = 366  # hari kosong di kiri dan kanan agar entri mundur/maju tidak memicu bangun ulang
+
+    def __init__(self, dasar, n):
+        self.dasar = dasar
+        self.n = n
+        self.pohon = {}
+
+    @classmethod
+    def dari_harian(cls, harian):
+        if harian.empty:
+            dasar = pd.Timestamp.today().normalize() - pd.Timedelta(days=cls.CADANGAN)
+            return cls(dasar, 2 * cls.CADANGAN + 1)
+        dasar = harian["Hari"].min() - pd.Timedelta(days=cls.CADANGAN)
+        indeks = cls(dasar, (harian["Hari"].max() - dasar).days + cls.CADANGAN + 1)
+        pos = (harian["Hari"] - dasar).dt.days.to_numpy() + 1
+        nilai = harian[["Debit", "Kredit"]].to_numpy(dtype=np.int64)
+        i = np.arange(indeks.n + 1)
+        for akun, baris in harian.groupby("Akun").indices.items():
+            per_hari = np.zeros((indeks.n + 1, 2), dtype=np.int64)
+            np.add.at(per_hari, pos[baris], nilai[baris])
+            prefix = per_hari.cumsum(axis=0)
+            # Simpul i menyimpan jumlah hari (i - lowbit(i), i], langsung dari prefix sum
+            indeks.pohon[akun] = prefix - prefix[i - (i & -i)]
+        return indeks
+
+    def posisi(self, tanggal):
+        return (pd.Timestamp(tanggal).normalize() - self.dasar).days + 1
+
+    def tambah(self, akun, tanggal, debit, kredit):
+        # False jika tanggal di luar rentang indeks; pemanggil lalu membangun ulang
+        if pd.isna(pd.to_datetime(tanggal, errors="coerce")):
+            return True
+        i = self.posisi(tanggal)
+        if not 1 <= i <= self.n:
+            return False
+        if akun not in self.pohon:
+            self.pohon[akun] = np.zeros((self.n + 1, 2), dtype=np.int64)
+        pohon = self.pohon[akun]
+        while i <= self.n:
+            pohon[i, 0] += debit
+            pohon[i, 1] += kredit
+            i += i & -i
+        return True
+
+    def saldo_per(self, akun, tanggal):
+        # (Debit, Kredit) kumulatif sampai dengan akhir hari `tanggal`
+        pohon = self.pohon.get(akun)
+        i = min(self.posisi(tanggal), self.n)
+        total = np.zeros(2, dtype=np.int64)
+        while pohon is not None and i > 0:
+            total += pohon[i]
+            i -= i & -i
+        return int(total[0]), int(total[1])
+
+    def ukuran(self):
+        return sum(p.nbytes for p in self.pohon.values())
+
+def saldo_harian(username):
+    # Total debit dan kredit per (Akun, hari), diambil dari rollup harian atau GROUP BY di SQLite
+    if STORAGE_BACKEND == "sqlite":
+        with get_pool().pinjam() as conn:
+            df = pd.read_sql_query(
+                "SELECT Akun, substr(Tanggal, 1, 10) AS Hari, SUM(Debit) AS Debit, SUM(Kredit) AS Kredit "
+                "FROM jurnal WHERE Username = ? AND Tanggal IS NOT NULL GROUP BY Akun, Hari",
+                conn,
+                params=[username],
+            )
+    else:
+        hari = load_rollup(username).get("jurnal", {}).get("hari", {})
+        df = pd.DataFrame(
+            [(json.loads(kunci)[0], h, d, k) for h, bucket in hari.items() for kunci, (d, k) in bucket.items()],
+            columns=["Akun", "Hari", "Debit", "Kredit"],
+        )
+    df["Hari"] = pd.to_datetime(df["Hari"], format="%Y-%m-%d", errors="coerce")
+    return df.dropna(subset=["Hari"])
+
+def versi_indeks(username):
+    return (versi_data("jurnal.csv", username), cap_file(file_versi_ringkasan(username)))
+
+def kunci_indeks(username):
+    return (STORAGE_BACKEND, "indeks_saldo", username)
+
+def get_indeks_saldo(username):
+    if STORAGE_BACKEND != "sqlite":
+        pulihkan_posting(username)
+    indeks = get_cache().ambil(kunci_indeks(username), versi_indeks(username))
+    if indeks is None:
+        indeks = IndeksSaldo.dari_harian(saldo_harian(username))
+        # Versi diambil setelah membangun, karena rollup bisa baru saja dibuat
+        get_cache().simpan(kunci_indeks(username), versi_indeks(username), indeks, indeks.ukuran())
+    return indeks
+
+BATAS_TAMBAH_INDEKS = 1000
+
+def perbarui_indeks_saldo(username, rows, versi_lama):
+    # Indeks di cache cukup ditambah baris baru; jika tidak ada di cache, dibangun saat dibutuhkan
+    indeks = get_cache().ambil(kunci_indeks(username), versi_lama)
+    get_cache().hapus(kunci_indeks(username))
+    if indeks is None or len(rows) > BATAS_TAMBAH_INDEKS:
+        # Posting besar (mis. impor Excel) lebih murah dibangun ulang dari rollup harian
+        return
+    for r in rows:
+        if not indeks.tambah(str(r["Akun"]), r["Tanggal"], int(r["Debit"]), int(r["Kredit"])):
+            return
+    get_cache().simpan(kunci_indeks(username), versi_indeks(username), indeks, indeks.ukuran())
+
+def saldo_pada(username, akun, tanggal):
+    debit, kredit = get_indeks_saldo(username).saldo_per(akun, tanggal)
+    return debit - kredit
+
+def saldo_awal(username, mulai):
+    # Saldo tiap akun pada akhir hari sebelum `mulai`
+    indeks = get_indeks_saldo(username)
+    kemarin = pd.Timestamp(mulai) - pd.Timedelta(days=1)
+    hasil = {}
+    for akun in indeks.pohon:
+        debit, kredit = indeks.saldo_per(akun, kemarin)
+        hasil[akun] = debit - kredit
+    return hasil
+
+# ==================== JURNAL PER HALAMAN ====================
+# Jurnal Umum hanya mengambil satu halaman; filter teks, urutan dan LIMIT/OFFSET
+# dikerjakan di penyimpanan sehingga yang dikirim ke browser selalu sebanyak satu halaman.
+KOLOM_URUT_JURNAL = ["Tanggal", "Akun", "Debit", "Kredit"]
+
+def pola_like(teks):
+    return "%" + teks.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def halaman_jurnal(username, mulai, akhir, halaman=1, per_halaman=50, urut="Tanggal", menurun=False, cari=""):
+    # Mengembalikan (baris halaman, jumlah baris yang cocok, nomor halaman setelah dibatasi)
+    if urut not in KOLOM_URUT_JURNAL:
+        raise ValueError(f"Kolom urut tidak dikenal: {urut}")
+    if STORAGE_BACKEND == "sqlite":
+        awal, batas = rentang_tanggal(mulai, akhir)
+        syarat = "Username = ? AND Tanggal >= ? AND Tanggal < ?"
+        params = [username, awal.strftime(FORMAT_TANGGAL), batas.strftime(FORMAT_TANGGAL)]
+        if cari:
+            syarat += " AND (Akun LIKE ? ESCAPE '\\' OR Keterangan LIKE ? ESCAPE '\\')"
+            params += [pola_like(cari)] * 2
+        arah = "DESC" if menurun else "ASC"
+        kolom = ", ".join(kutip(k) for k in KOLOM_TABEL["jurnal"])
+        with get_pool().pinjam() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM jurnal WHERE {syarat}", params).fetchone()[0]
+            halaman = min(max(1, halaman), max(1, -(-total // per_halaman)))
+            df = pd.read_sql_query(
+                f"SELECT {kolom} FROM jurnal WHERE {syarat} ORDER BY {kutip(urut)} {arah}, Tanggal {arah}, rowid {arah} LIMIT ? OFFSET ?",
+                conn,
+                params=params + [per_halaman, (halaman - 1) * per_halaman],
+            )
+        return terapkan_skema(df, "jurnal"), total, halaman
+    df = load_data_periode("jurnal.csv", username, mulai, akhir)
+    if cari and not df.empty:
+        keterangan = df["Keterangan"].fillna("").astype(str).str.contains(cari, case=False, regex=False)
+        df = df[cocok_kategori(df["Akun"], cari) | keterangan]
+    total = len(df)
+    halaman = min(max(1, halaman), max(1, -(-total // per_halaman)))
+    if urut == "Tanggal":
+        # Tabel di cache sudah urut Tanggal, jadi cukup dibalik bila menurun
+        df = df.iloc[::-1] if menurun else df
+    else:
+        # Akun diurutkan menurut nama, bukan menurut urutan kosakata
+        df = df.sort_values(
+            [urut, "Tanggal"], ascending=not menurun, kind="stable",
+            key=lambda k: k.astype(str) if isinstance(k.dtype, pd.CategoricalDtype) else k,
+        )
+    awal = (halaman - 1) * per_halaman
+    return df.iloc[awal:awal + per_halaman], total, halaman
+
+# ==================== BUKU BESAR ====================
+def buku_besar(jurnal_df, saldo_awal=None):
+    # Satu kali sort (Akun, Tanggal) dan satu cumsum per grup untuk semua akun.
+    # Tiap akun menempati baris yang berurutan, jadi cukup dicatat posisi awal dan akhirnya.
+    df = jurnal_df.sort_values(["Akun", "Tanggal"], kind="stable").reset_index(drop=True)
+    df["Saldo"] = (df["Debit"] - df["Kredit"]).groupby(df["Akun"], observed=True).cumsum()
+    if saldo_awal:
+        # Saldo berjalan dimulai dari saldo akun sebelum tanggal mulai
+        df["Saldo"] += df["Akun"].astype(object).map(saldo_awal).fillna(0).astype("int64")
+    if df.empty:
+        return df, {}
+    akun = df["Akun"].to_numpy()
+    batas = np.flatnonzero(akun[1:] != akun[:-1]) + 1
+    awal = np.concatenate(([0], batas))
+    akhir = np.concatenate((batas, [len(df)]))
+    return df, {akun[a]: (a, b) for a, b in zip(awal, akhir)}
+
+def buku_besar_akun(df, posisi, akun):
+    awal, akhir = posisi[akun]
+    return df.iloc[awal:akhir]
+
+# ==================== REPORT ENGINE ====================
+# Semua angka Ringkasan, Laba Rugi dan Neraca diturunkan dari satu agregasi
+# per (kelas akun, Akun) untuk rentang yang dipilih.
+@dataclass(frozen=True)
+class LaporanKeuangan:
+    total_pemasukan: int
+    total_pengeluaran: int
+    pendapatan: int
+    beban: int
+    aktiva: int
+    kewajiban: int
+    modal: int
+    per_kelas: pd.DataFrame
+    akun_tak_dikenal: tuple = ()
+
+    @property
+    def saldo(self):
+        return self.total_pemasukan - self.total_pengeluaran
+
+    @property
+    def laba_rugi(self):
+        return self.pendapatan - self.beban
+
+    @property
+    def ekuitas(self):
+        return self.modal + self.laba_rugi
+
+def susun_laporan(username, mulai, akhir):
+    saldo_df = saldo_periode(username, mulai, akhir)
+    saldo_df["Kelas"] = kode_kelas(saldo_df["Akun"])
+    per_kelas = saldo_df.groupby(["Kelas", "Akun"])[["Debit", "Kredit", "Saldo"]].sum()
+    kelas = per_kelas.groupby(level="Kelas").sum()
+
+    def total(kode, kolom):
+        return int(kelas[kolom].get(kode, 0))
+
+    return LaporanKeuangan(
+        total_pemasukan=int(rollup_periode("pemasukan", username, mulai, akhir)["Jumlah"].sum()),
+        total_pengeluaran=int(rollup_periode("pengeluaran", username, mulai, akhir)["Jumlah"].sum()),
+        pendapatan=total(KELAS_PENDAPATAN, "Kredit"),
+        beban=total(KELAS_BEBAN, "Debit"),
+        aktiva=total(KELAS_ASET, "Saldo"),
+        kewajiban=-total(KELAS_KEWAJIBAN, "Saldo"),
+        modal=-total(KELAS_EKUITAS, "Saldo"),
+        per_kelas=per_kelas,
+        akun_tak_dikenal=tuple(saldo_df.loc[saldo_df["Kelas"] == KELAS_TAK_DIKENAL, "Akun"].unique()),
+    )
+
+# ==================== ANGGARAN LOGIN ====================
+# Anggaran waktu (detik) di sisi server, dari baris pertama skrip (WAKTU_MULAI) sampai
+# run pertama halaman login selesai dikirim; waktu render di browser tidak termasuk.
+# Terukur di proses dingin: 0,73-0,92 s, sekitar 0,5 s di antaranya impor pandas+numpy.
+# plotly tidak ikut diimpor di halaman login (lihat IMPOR TERTUNDA di sipadi_core).
+ANGGARAN_LOGIN = float(os.environ.get("SIPADI_ANGGARAN_LOGIN", "1.0"))
+
+@st.cache_resource
+def status_anggaran_login():
+    return {"terukur": False}
+
+def cek_anggaran_login():
+    # Hanya tampilan pertama di proses ini yang diukur: run itulah yang menanggung
+    # impor dingin, rerun berikutnya tidak berarti apa-apa untuk anggaran ini
+    status = status_anggaran_login()
+    if status["terukur"]:
+        return None
+    status["terukur"] = True
+    lama = time.perf_counter() - WAKTU_MULAI
+    if lama > ANGGARAN_LOGIN:
+        logging.getLogger("sipadi").warning(
+            "Halaman login tampil dalam %.2f s, melebihi anggaran %.2f s", lama, ANGGARAN_LOGIN
+        )
+    return lama
+
+# ==================== ASET STATIS ====================
+# Logo di-resize sekali per proses oleh ManajerAset (sipadi_core) ke ukuran
+# yang benar-benar ditampilkan.
+LOGO_FILE = "aset/logo.jpg"
+LEBAR_LOGO_HEADER = 80
+
+def tampilkan_logo(lebar, wadah=st):
+    data = get_manajer_aset().gambar(LOGO_FILE, lebar)
+    if data is None:
+        return False
+    wadah.image(data, width=lebar)
+    return True
 
 # ==================== CUSTOM STYLING ====================
-def apply_custom_styles():
-    st.markdown("""
+# Blok CSS dirakit sekali saat modul dimuat; setiap rerun mengirim string yang sama.
+CSS_KUSTOM = """
     <style>
         .stButton>button {
             background-color: #4CAF50;
@@ -103,7 +1105,10 @@ def apply_custom_styles():
             padding: 10px;
         }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def apply_custom_styles():
+    st.markdown(CSS_KUSTOM, unsafe_allow_html=True)
 
 # ==================== LOGIN & REGISTER ====================
 def login_register():
@@ -113,6 +1118,14 @@ def login_register():
         st.session_state['username'] = ""
 
     if st.session_state['logged_in']:
+        tulis_cookie_sesi(COOKIE_SESI)
+        return True
+
+    username = pulihkan_sesi(COOKIE_SESI)
+    tulis_cookie_sesi(COOKIE_SESI)
+    if username:
+        st.session_state['logged_in'] = True
+        st.session_state['username'] = username
         return True
 
     st.title("Login / Daftar Akun")
@@ -132,6 +1145,7 @@ def login_register():
                 elif validate_login(username, password):
                     st.session_state['logged_in'] = True
                     st.session_state['username'] = username
+                    mulai_sesi(username)
                     st.success(f"Login berhasil! Selamat datang, {username}.")
                     st.balloons()
                     st.rerun()
@@ -163,22 +1177,99 @@ kategori_pemasukan = {
     "Sumber Pemasukan": ["Penjualan Padi", "Lain-lain"]
 }
 
+# ==================== BAGAN AKUN ====================
+# Kode, kelas (aset/kewajiban/ekuitas/pendapatan/beban), saldo normal dan induk tiap akun.
+KELAS_ASET, KELAS_KEWAJIBAN, KELAS_EKUITAS, KELAS_PENDAPATAN, KELAS_BEBAN = 1, 2, 3, 4, 5
+
+@dataclass(frozen=True)
+class AkunBagan:
+    kode: str
+    nama: str
+    kelas: int
+    induk: str = None
+
+    @property
+    def saldo_normal(self):
+        return "Debit" if self.kelas in (KELAS_ASET, KELAS_BEBAN) else "Kredit"
+
+def susun_bagan_akun():
+    # Akun beban diturunkan dari kategori pengeluaran: kategori menjadi induk, sub kategori menjadi akunnya
+    bagan = [
+        AkunBagan("1", "Aset", KELAS_ASET),
+        AkunBagan("1-1", "Kas", KELAS_ASET, "1"),
+        AkunBagan("1-2", "Bank", KELAS_ASET, "1"),
+        AkunBagan("1-3", "Piutang Dagang", KELAS_ASET, "1"),
+        AkunBagan("1-4", "Perlengkapan", KELAS_ASET, "1"),
+        AkunBagan("1-5", "Sewa Dibayar Dimuka", KELAS_ASET, "1"),
+        AkunBagan("1-6", "Peralatan", KELAS_ASET, "1"),
+        AkunBagan("2", "Kewajiban", KELAS_KEWAJIBAN),
+        AkunBagan("2-1", "Utang Dagang", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("2-2", "Pendapatan Diterima Dimuka", KELAS_KEWAJIBAN, "2"),
+        AkunBagan("3", "Ekuitas", KELAS_EKUITAS),
+        AkunBagan("3-1", "Modal", KELAS_EKUITAS, "3"),
+        AkunBagan("3-2", "Prive", KELAS_EKUITAS, "3"),
+        AkunBagan("4", "Pendapatan Usaha", KELAS_PENDAPATAN),
+        AkunBagan("4-1", "Pendapatan", KELAS_PENDAPATAN, "4"),
+        AkunBagan("5", "Beban Usaha", KELAS_BEBAN),
+    ]
+    for i, (kategori, sub_kategori) in enumerate(kategori_pengeluaran.items(), start=1):
+        induk = f"5-{i}"
+        bagan.append(AkunBagan(induk, f"Beban {kategori}", KELAS_BEBAN, "5"))
+        for j, sub in enumerate(sub_kategori, start=1):
+            bagan.append(AkunBagan(f"{induk}-{j}", sub, KELAS_BEBAN, induk))
+    return {akun.nama: akun for akun in bagan}
+
+BAGAN_AKUN = susun_bagan_akun()
+# Kode kategori Akun yang tetap untuk semua user hanyalah nama-nama di bagan akun
+kenalkan("Akun", BAGAN_AKUN)
+
+# Akun di luar bagan hanya digolongkan jika namanya jelas; sisanya KELAS_TAK_DIKENAL
+# dan ditampilkan di laporan, tidak diam-diam dihitung sebagai beban
+KELAS_TAK_DIKENAL = 0
+POLA_PENDAPATAN = re.compile("pendapatan|penjualan", re.IGNORECASE)
+POLA_BEBAN = re.compile("beban|pengeluaran|gaji|pajak|harga pokok", re.IGNORECASE)
+
+def kelas_akun(akun):
+    if akun in BAGAN_AKUN:
+        return BAGAN_AKUN[akun].kelas
+    # Beban dicek dulu: "Harga Pokok Penjualan" adalah beban walau memuat kata penjualan
+    if POLA_BEBAN.search(str(akun)):
+        return KELAS_BEBAN
+    if POLA_PENDAPATAN.search(str(akun)):
+        return KELAS_PENDAPATAN
+    return KELAS_TAK_DIKENAL
+
+PESAN_AKUN_TAK_DIKENAL = "Akun di luar bagan akun, belum dihitung di laporan: "
+
+def kode_kelas(kolom):
+    # Kelas dihitung sekali per kategori Akun, lalu disebar ke tiap baris lewat kode integer
+    kolom = kodekan("Akun", kolom)
+    per_kategori = np.array([kelas_akun(a) for a in kolom.cat.categories] + [KELAS_TAK_DIKENAL], dtype=np.int8)
+    return pd.Series(per_kategori[kolom.cat.codes.to_numpy()], index=kolom.index)
+
+def kode_akun(akun):
+    # Urutan tampilan mengikuti kode bagan; akun di luar bagan ditaruh paling akhir
+    return BAGAN_AKUN[akun].kode if akun in BAGAN_AKUN else f"9-{akun}"
+
 # ==================== INCOME FUNCTION ====================
+# Form isian berjalan sebagai fragment: isian dikirim sekaligus saat disimpan,
+# dan hanya bagian form yang dijalankan ulang, bukan CSS, logo dan sidebar.
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
     st.write("---")
     
-    with st.container():
+    with st.form("form_pemasukan", clear_on_submit=True):
         col1, col2 = st.columns(2)
         with col1:
             tanggal = st.date_input("Tanggal", datetime.now())
             sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-            jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+            jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
         with col2:
             deskripsi = st.text_area("Keterangan (opsional)") 
             metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"], horizontal=True)
         
-        if st.button("Simpan Pemasukan", use_container_width=True):
+        if st.form_submit_button("Simpan Pemasukan", use_container_width=True):
             if not sumber.strip() or jumlah <= 0:
                 st.error("Isi data dengan benar.")
                 return
@@ -192,7 +1283,6 @@ def pemasukan():
                 "Keterangan": deskripsi,
                 "Username": username
             }
-            append_data(data, "pemasukan.csv", username)
             akun_debit = {
                 "Tunai": "Kas",
                 "Transfer": "Bank",
@@ -201,28 +1291,29 @@ def pemasukan():
             }[metode]
             akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
             jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
-            for j in jurnal:
-                append_data(j, "jurnal.csv", username)
+            posting_jurnal(jurnal, data, "pemasukan.csv", username)
             st.success("Pemasukan berhasil disimpan.")
             st.balloons()
 
 # ==================== EXPENSE FUNCTION ====================
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
     st.write("---")
     
-    with st.container():
+    # Di luar form karena pilihan Sub Kategori bergantung padanya; perubahan hanya menjalankan ulang fragment
+    kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
+    with st.form("form_pengeluaran", clear_on_submit=True):
         col1, col2 = st.columns(2)
         with col1:
             tanggal = st.date_input("Tanggal", datetime.now())
-            kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
             sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-            jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+            jumlah = rupiah(st.number_input("Jumlah (Rp)", min_value=0, step=1))
         with col2:
             deskripsi = st.text_area("Keterangan (opsional)")
             metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"], horizontal=True)
         
-        if st.button("Simpan Pengeluaran", use_container_width=True):
+        if st.form_submit_button("Simpan Pengeluaran", use_container_width=True):
             if jumlah <= 0:
                 st.error("Jumlah tidak boleh 0.")
                 return
@@ -237,7 +1328,6 @@ def pengeluaran():
                 "Metode": metode,
                 "Username": username
             }
-            append_data(data, "pengeluaran.csv", username)
             akun_kredit = {
                 "Tunai": "Kas",
                 "Transfer": "Bank",
@@ -246,17 +1336,406 @@ def pengeluaran():
             }[metode]
             akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
             jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
-            for j in jurnal:
-                append_data(j, "jurnal.csv", username)
+            posting_jurnal(jurnal, data, "pengeluaran.csv", username)
             st.success("Pengeluaran berhasil disimpan.")
             st.balloons()
 
+# ==================== IMPOR EXCEL ====================
+# Buku jurnal lama dari Excel dibaca baris demi baris (openpyxl read_only),
+# dikumpulkan per batch, divalidasi sekaligus dengan pandas, lalu tiap batch
+# diposting dalam satu commit. Yang ada di memori hanya satu batch, jadi
+# workbook ratusan ribu baris tidak membuat pemakaian memori ikut naik.
+UKURAN_BATCH_IMPOR = 5000
+MAKS_CONTOH_GALAT = 50
+BARIS_CARI_HEADER = 50
+KOLOM_IMPOR = ["Tanggal", "Akun", "Debit", "Kredit", "Keterangan"]
+BARIS_TOTAL = {"total", "jumlah", "jumlah total"}
+
+NAMA_KOLOM_IMPOR = {
+    "Tanggal": ["tanggal", "tgl", "date"],
+    "Akun": ["akun", "nama akun", "rekening", "nama rekening", "perkiraan", "account"],
+    "Debit": ["debit", "debet"],
+    "Kredit": ["kredit", "credit"],
+    "Keterangan": ["keterangan", "uraian", "deskripsi", "memo"],
+}
+
+NAMA_BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni",
+              "Juli", "Agustus", "September", "Oktober", "November", "Desember"]
+
+BULAN_INDONESIA = {
+    "jan": 1, "januari": 1, "feb": 2, "peb": 2, "februari": 2, "mar": 3, "maret": 3,
+    "apr": 4, "april": 4, "mei": 5, "jun": 6, "juni": 6, "jul": 7, "juli": 7,
+    "agu": 8, "agt": 8, "ags": 8, "agustus": 8, "sep": 9, "sept": 9, "september": 9,
+    "okt": 10, "oktober": 10, "nov": 11, "nop": 11, "november": 11, "des": 12, "desember": 12,
+}
+
+# Nama akun yang umum di buku jurnal lama tetapi ditulis lain di bagan akun
+SINONIM_AKUN = {
+    "piutang usaha": "Piutang Dagang",
+    "utang usaha": "Utang Dagang",
+    "hutang usaha": "Utang Dagang",
+    "hutang dagang": "Utang Dagang",
+    "modal pemilik": "Modal",
+    "sewa dibayar di muka": "Sewa Dibayar Dimuka",
+    "pendapatan diterima di muka": "Pendapatan Diterima Dimuka",
+}
+
+NAMA_AKUN_BAKU = {**{nama.lower(): nama for nama in BAGAN_AKUN}, **SINONIM_AKUN}
+
+@dataclass
+class HasilImpor:
+    baris: int = 0
+    diposting: int = 0
+    dilewati: int = 0
+    ditolak: int = 0
+    galat: list = field(default_factory=list)
+
+    def tolak(self, nomor_baris, alasan):
+        self.ditolak += len(nomor_baris)
+        ruang = MAKS_CONTOH_GALAT - len(self.galat)
+        if ruang > 0:
+            self.galat.extend(zip(list(nomor_baris)[:ruang], list(alasan)[:ruang]))
+
+def normal_header(nilai):
+    return re.sub(r"\s+", " ", str(nilai if nilai is not None else "")).strip().lower()
+
+def tebak_kolom(header):
+    peta = {}
+    for target, alias in NAMA_KOLOM_IMPOR.items():
+        for i, nama in enumerate(header):
+            if nama in alias and i not in peta.values():
+                peta[target] = i
+                break
+    if "Akun" not in peta and "Keterangan" in peta:
+        # Jurnal tulisan tangan biasa menaruh nama akun di kolom Keterangan
+        peta["Akun"] = peta.pop("Keterangan")
+    return peta
+
+def cari_header(ws):
+    # Header adalah baris pertama yang memuat kolom tanggal, debit dan kredit
+    for nomor, row in enumerate(ws.iter_rows(max_row=BARIS_CARI_HEADER, values_only=True), start=1):
+        header = [normal_header(v) for v in row]
+        if tebak_kolom(header).keys() >= {"Tanggal", "Debit", "Kredit"}:
+            return nomor, header
+    return None, []
+
+def baca_batch(ws, baris_header, peta):
+    # Akun kredit sering ditulis menjorok satu kolom ke kanan; kolom itu ikut dibaca
+    # sebagai cadangan bila tidak dipetakan ke kolom lain
+    kanan = peta["Akun"] + 1 if peta["Akun"] + 1 not in peta.values() else None
+    indeks = [peta.get(k) for k in KOLOM_IMPOR] + [kanan]
+    kolom = KOLOM_IMPOR + ["AkunKanan"]
+    batch, nomor = [], []
+    for n, row in enumerate(ws.iter_rows(min_row=baris_header + 1, values_only=True), start=baris_header + 1):
+        batch.append([row[i] if i is not None and i < len(row) else None for i in indeks])
+        nomor.append(n)
+        if len(batch) == UKURAN_BATCH_IMPOR:
+            yield pd.DataFrame(batch, columns=kolom, index=nomor, dtype=object)
+            batch, nomor = [], []
+    if batch:
+        yield pd.DataFrame(batch, columns=kolom, index=nomor, dtype=object)
+
+def sel_kosong(kolom):
+    return kolom.isna() | kolom.astype(str).str.strip().isin(["", "-"])
+
+def baris_total(df):
+    return (
+        df["Tanggal"].astype(str).str.strip().str.lower().isin(BARIS_TOTAL)
+        | df["Akun"].astype(str).str.strip().str.lower().isin(BARIS_TOTAL)
+    )
+
+def parse_tanggal_impor(kolom, tahun, bulan=None):
+    # Sel tanggal Excel sudah berupa datetime; teks "1 Mei" memakai `tahun`,
+    # angka hari saja memakai `bulan` dan `tahun` (jika bulan diberikan),
+    # teks lain dicoba ISO dulu lalu format hari-bulan-tahun
+    hasil = pd.Series(pd.NaT, index=kolom.index, dtype="datetime64[ns]")
+    nilai = kolom[~sel_kosong(kolom)]
+    hari = pd.to_numeric(nilai, errors="coerce")
+    if bulan is not None and hari.notna().any():
+        hari = hari[hari.notna()]
+        hasil[hari.index] = pd.to_datetime(
+            pd.DataFrame({"year": tahun, "month": bulan, "day": hari}, index=hari.index), errors="coerce"
+        )
+    nilai = nilai[pd.to_numeric(nilai, errors="coerce").isna()]
+    if nilai.empty:
+        return hasil
+    teks = nilai.astype(str).str.strip().str.lower()
+    bagian = teks.str.extract(r"^(\d{1,2})[\s\-/]*([a-z]+)\.?[\s\-/]*(\d{4})?$")
+    bulan = bagian[1].map(BULAN_INDONESIA)
+    indo = bulan.notna()
+    if indo.any():
+        komponen = pd.DataFrame({
+            "year": pd.to_numeric(bagian.loc[indo, 2]).fillna(tahun),
+            "month": bulan[indo],
+            "day": pd.to_numeric(bagian.loc[indo, 0]),
+        })
+        hasil[komponen.index] = pd.to_datetime(komponen, errors="coerce")
+    sisa = nilai[~indo]
+    if not sisa.empty:
+        iso = pd.to_datetime(sisa, errors="coerce", format="ISO8601")
+        lain = iso.isna()
+        if lain.any():
+            iso[lain] = pd.to_datetime(sisa[lain], errors="coerce", dayfirst=True, format="mixed")
+        hasil[sisa.index] = iso
+    return hasil
+
+def angka_impor(kolom):
+    angka = pd.to_numeric(kolom, errors="coerce").astype("float64")
+    teks = kolom[angka.isna() & ~sel_kosong(kolom)].astype(str).str.strip()
+    if not teks.empty:
+        # Format Indonesia: "Rp 1.250.000,50" dan "(500.000)" untuk negatif
+        bersih = teks.str.replace(r"(?i)rp|\s|\.", "", regex=True).str.replace(",", ".", regex=False)
+        bersih = bersih.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+        angka[bersih.index] = pd.to_numeric(bersih, errors="coerce")
+    return angka.replace([np.inf, -np.inf], np.nan)
+
+def akun_impor(df, peta_akun=None):
+    # Nama akun dirapikan lalu dicocokkan ke bagan akun; `peta_akun` (nama huruf kecil ->
+    # akun bagan) berisi pilihan pengguna untuk nama yang tidak cocok
+    akun = df["Akun"].where(~sel_kosong(df["Akun"]), df["AkunKanan"].where(~sel_kosong(df["AkunKanan"])))
+    akun = akun.astype("string").str.strip().str.replace(r"\s+", " ", regex=True)
+    kunci = akun.str.lower()
+    akun = kunci.map(NAMA_AKUN_BAKU).fillna(akun)
+    if peta_akun:
+        akun = kunci.map(peta_akun).fillna(akun)
+    return akun
+
+def akun_luar_bagan(berkas, sheet, peta):
+    # Nama akun di sheet yang tidak ada di bagan akun beserta jumlah barisnya, untuk langkah
+    # pemetaan akun sebelum impor. Baris tanpa jumlah tidak dihitung.
+    from openpyxl import load_workbook
+    wb = load_workbook(berkas, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet]
+        baris_header, _ = cari_header(ws)
+        jumlah = {}
+        for batch in baca_batch(ws, baris_header, peta):
+            ada_jumlah = angka_impor(batch["Debit"]).fillna(0).ne(0) | angka_impor(batch["Kredit"]).fillna(0).ne(0)
+            akun = akun_impor(batch)[ada_jumlah & ~baris_total(batch)].dropna()
+            for nama, n in akun[~akun.isin(list(BAGAN_AKUN))].value_counts().items():
+                jumlah[nama] = jumlah.get(nama, 0) + int(n)
+    finally:
+        wb.close()
+    return jumlah
+
+def validasi_batch(df, tahun, bulan, tanggal_sebelumnya, keterangan_default, peta_akun=None):
+    # Mengembalikan (baris valid, baris ditolak beserta alasan, jumlah dilewati, tanggal terakhir)
+    total = baris_total(df)
+    ada_tanggal = ~sel_kosong(df["Tanggal"]) & ~total
+    tanggal = parse_tanggal_impor(df["Tanggal"].where(ada_tanggal), tahun, bulan)
+    # Baris tanpa tanggal ikut tanggal di atasnya, seperti baris kredit di jurnal tulisan tangan
+    kelompok = ada_tanggal.cumsum()
+    tanggal = tanggal.groupby(kelompok).transform("first")
+    tanggal[kelompok == 0] = tanggal_sebelumnya if tanggal_sebelumnya is not None else pd.NaT
+    debit, kredit = angka_impor(df["Debit"]), angka_impor(df["Kredit"])
+    salah_angka = (~sel_kosong(df["Debit"]) & debit.isna()) | (~sel_kosong(df["Kredit"]) & kredit.isna())
+    debit, kredit = debit.fillna(0), kredit.fillna(0)
+    # Seperti rupiah(): jumlah pecahan ditolak, tidak dibulatkan diam-diam
+    pecahan = ~salah_angka & ((debit % 1 != 0) | (kredit % 1 != 0))
+    akun = akun_impor(df, peta_akun)
+    # Akun yang tidak dikenal tidak boleh masuk jurnal; entrinya ikut tertahan sebagai tidak seimbang
+    kelas = {nama: kelas_akun(nama) for nama in akun.dropna().unique()}
+    luar_bagan = akun.map(kelas).eq(KELAS_TAK_DIKENAL)
+    # Judul, baris total, baris kosong dan catatan tanpa jumlah dilewati tanpa dianggap salah
+    dilewati = (~salah_angka & debit.eq(0) & kredit.eq(0)) | total
+    alasan = pd.Series(np.select(
+        [salah_angka, pecahan, ada_tanggal & tanggal.isna(), tanggal.isna(), (debit < 0) | (kredit < 0),
+         (debit > 0) & (kredit > 0), akun.isna(), luar_bagan],
+        ["Jumlah bukan angka", "Jumlah harus dalam Rupiah utuh", "Tanggal tidak dikenali", "Tanggal kosong",
+         "Jumlah negatif", "Debit dan Kredit terisi bersamaan", "Akun kosong", "Akun di luar bagan akun"],
+        default="",
+    ), index=df.index)
+    alasan[dilewati] = ""
+    valid = ~dilewati & alasan.eq("")
+    if "Keterangan" in df and df["Keterangan"].notna().any():
+        keterangan = df["Keterangan"].where(~sel_kosong(df["Keterangan"]), keterangan_default).astype(str).str.strip()
+    else:
+        keterangan = pd.Series(keterangan_default, index=df.index)
+    hasil = pd.DataFrame({
+        "Tanggal": tanggal,
+        "Akun": akun,
+        "Debit": debit.where(valid, 0).astype("int64"),
+        "Kredit": kredit.where(valid, 0).astype("int64"),
+        "Keterangan": keterangan,
+        "BarisTanggal": ada_tanggal,
+    })[valid]
+    tanggal_terakhir = tanggal.iloc[-1] if len(tanggal) and pd.notna(tanggal.iloc[-1]) else tanggal_sebelumnya
+    ditolak = alasan[~dilewati & ~valid]
+    return hasil, ditolak, int(dilewati.sum()), tanggal_terakhir
+
+def kelompokkan_entri(df):
+    # Entri baru dimulai di baris bertanggal baru, atau saat selisih debit-kredit
+    # yang berjalan kembali ke nol. Entri seimbang bila total selisihnya nol.
+    selisih = df["Debit"] - df["Kredit"]
+    awal_segmen = df["BarisTanggal"] & df["Tanggal"].ne(df["Tanggal"].shift())
+    awal_segmen.iloc[0] = True
+    sebelum = selisih.groupby(awal_segmen.cumsum()).cumsum() - selisih
+    entri = (awal_segmen | sebelum.eq(0)).cumsum()
+    seimbang = selisih.groupby(entri).transform("sum").eq(0)
+    return entri, seimbang
+
+def posting_batch_impor(valid, username, hasil, terakhir):
+    # Entri yang masih terbuka di ujung batch dibawa ke batch berikutnya
+    if valid is None or valid.empty:
+        return None
+    entri, seimbang = kelompokkan_entri(valid)
+    terbuka = pd.Series(False, index=valid.index)
+    if not terakhir and not seimbang.iloc[-1]:
+        terbuka = entri.eq(entri.iloc[-1])
+    tidak_seimbang = ~seimbang & ~terbuka
+    hasil.tolak(valid.index[tidak_seimbang], ["Entri tidak seimbang"] * int(tidak_seimbang.sum()))
+    siap = valid[seimbang]
+    if not siap.empty:
+        jurnal = siap[KOLOM_TABEL["jurnal"]].assign(Tanggal=siap["Tanggal"].dt.strftime(FORMAT_TANGGAL))
+        posting_jurnal(jurnal.to_dict("records"), None, None, username)
+        hasil.diposting += len(jurnal)
+    sisa = valid[terbuka]
+    if len(sisa) > UKURAN_BATCH_IMPOR:
+        # Entri sepanjang ini hampir pasti salah ketik, jangan ditahan di memori
+        hasil.tolak(sisa.index, ["Entri tidak seimbang"] * len(sisa))
+        return None
+    return sisa if not sisa.empty else None
+
+def impor_jurnal_excel(berkas, username, sheet=None, peta=None, tahun=None, bulan=None,
+                       keterangan_default="Impor Excel", peta_akun=None, kemajuan=None):
+    from openpyxl import load_workbook
+    tahun = tahun or datetime.now().year
+    wb = load_workbook(berkas, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        baris_header, header = cari_header(ws)
+        if baris_header is None:
+            raise ValueError("Header dengan kolom Tanggal, Debit dan Kredit tidak ditemukan.")
+        peta = peta or tebak_kolom(header)
+        kurang = [k for k in ["Tanggal", "Akun", "Debit", "Kredit"] if k not in peta]
+        if kurang:
+            raise ValueError(f"Kolom belum dipetakan: {', '.join(kurang)}.")
+        hasil, sisa, tanggal_terakhir = HasilImpor(), None, None
+        for batch in baca_batch(ws, baris_header, peta):
+            hasil.baris += len(batch)
+            valid, ditolak, dilewati, tanggal_terakhir = validasi_batch(
+                batch, tahun, bulan, tanggal_terakhir, keterangan_default, peta_akun
+            )
+            hasil.dilewati += dilewati
+            hasil.tolak(ditolak.index, ditolak)
+            if sisa is not None:
+                valid = pd.concat([sisa, valid])
+            sisa = posting_batch_impor(valid, username, hasil, terakhir=False)
+            if kemajuan is not None:
+                kemajuan(hasil, ws.max_row)
+        posting_batch_impor(sisa, username, hasil, terakhir=True)
+    finally:
+        wb.close()
+    return hasil
+
+# ==================== IMPORT FUNCTION ====================
+def impor_excel():
+    st.subheader("Impor Jurnal dari Excel")
+    st.write("---")
+    st.write("Unggah buku jurnal lama (.xlsx) yang memiliki kolom Tanggal, Akun/Keterangan, Debit dan Kredit.")
+
+    berkas = st.file_uploader("File Excel", type=["xlsx"])
+    if berkas is None:
+        return
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        st.error("Impor Excel membutuhkan paket openpyxl.")
+        return
+
+    wb = load_workbook(berkas, read_only=True, data_only=True)
+    try:
+        sheet = st.selectbox("Sheet", wb.sheetnames)
+        baris_header, header = cari_header(wb[sheet])
+    finally:
+        wb.close()
+    if baris_header is None:
+        st.error("Header dengan kolom Tanggal, Debit dan Kredit tidak ditemukan di 50 baris pertama sheet ini.")
+        return
+
+    st.caption(f"Header ditemukan di baris {baris_header}.")
+    tebakan = tebak_kolom(header)
+    pilihan = [None] + list(range(len(header)))
+    peta = {}
+    cols = st.columns(len(KOLOM_IMPOR))
+    for col, target in zip(cols, KOLOM_IMPOR):
+        with col:
+            indeks = st.selectbox(
+                target, pilihan,
+                index=pilihan.index(tebakan[target]) if target in tebakan else 0,
+                format_func=lambda i: "(tidak ada)" if i is None else f"{i + 1}. {header[i] or '-'}",
+                key=f"impor_{target}",
+            )
+        if indeks is not None:
+            peta[target] = indeks
+    col1, col2 = st.columns(2)
+    with col1:
+        tahun = int(st.number_input("Tahun untuk tanggal tanpa tahun (mis. \"1 Mei\")",
+                                    min_value=1900, max_value=2100, value=datetime.now().year, step=1))
+    with col2:
+        bulan = st.selectbox("Bulan untuk tanggal berupa angka hari saja", [None] + list(range(1, 13)),
+                             format_func=lambda b: "(tidak ada)" if b is None else NAMA_BULAN[b - 1])
+
+    # Pemetaan akun: nama di Excel yang tidak ada di bagan akun dipilihkan akun bagannya.
+    # Nama yang dibiarkan tetap hanya diterima bila jelas pendapatan atau beban.
+    peta_akun = {}
+    kurang = [k for k in ["Tanggal", "Akun", "Debit", "Kredit"] if k not in peta]
+    if not kurang:
+        kunci = (berkas.file_id, sheet, tuple(sorted(peta.items())))
+        if st.session_state.get("impor_akun_kunci") != kunci:
+            berkas.seek(0)
+            st.session_state["impor_akun"] = akun_luar_bagan(berkas, sheet, peta)
+            st.session_state["impor_akun_kunci"] = kunci
+        luar_bagan = st.session_state["impor_akun"]
+        if luar_bagan:
+            st.write("**Pemetaan Akun**")
+            st.caption("Akun berikut tidak ada di bagan akun. Baris dengan akun yang tetap tidak dikenal akan ditolak.")
+            tujuan = [a.nama for a in BAGAN_AKUN.values() if a.induk]
+            for nama, n in luar_bagan.items():
+                kelas = kelas_akun(nama)
+                tetap = {KELAS_PENDAPATAN: "pendapatan", KELAS_BEBAN: "beban"}.get(kelas, "ditolak")
+                pilihan_akun = st.selectbox(
+                    f"{nama} ({n:,} baris)", [nama] + tujuan,
+                    format_func=lambda a, nama=nama, tetap=tetap: f"(tetap: {tetap})" if a == nama else a,
+                    key=f"impor_akun_{nama}",
+                )
+                if pilihan_akun != nama:
+                    peta_akun[nama.lower()] = pilihan_akun
+
+    if st.button("Impor Jurnal", use_container_width=True):
+        if kurang:
+            st.error(f"Pilih kolom untuk: {', '.join(kurang)}.")
+            return
+        progres = st.progress(0.0, text="Mengimpor...")
+
+        def kemajuan(hasil, total):
+            if total:
+                progres.progress(min(hasil.baris / max(total - baris_header, 1), 1.0),
+                                 text=f"{hasil.baris:,} baris dibaca")
+
+        berkas.seek(0)
+        try:
+            hasil = impor_jurnal_excel(berkas, st.session_state['username'], sheet, peta, tahun, bulan,
+                                       f"Impor {berkas.name}", peta_akun, kemajuan)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        progres.progress(1.0, text=f"{hasil.baris:,} baris dibaca")
+        st.success(f"{hasil.diposting:,} baris jurnal diposting, {hasil.dilewati:,} baris tanpa jumlah dilewati, "
+                   f"{hasil.ditolak:,} baris ditolak.")
+        if hasil.galat:
+            st.write(f"Contoh baris yang ditolak (maks. {MAKS_CONTOH_GALAT}):")
+            st.dataframe(pd.DataFrame(hasil.galat, columns=["Baris Excel", "Alasan"]), hide_index=True)
+
 # ==================== REPORT FUNCTION ====================
+BAGIAN_LAPORAN = ["Ringkasan", "Jurnal Umum", "Buku Besar", "Laba Rugi", "Neraca"]
+
 def laporan():
     st.header("Laporan Keuangan")
     st.write("---")
     
     username = st.session_state['username']
+    px = muat_plotly()
 
     col1, col2 = st.columns(2)
     with col1:
@@ -264,111 +1743,122 @@ def laporan():
     with col2:
         akhir = st.date_input("Tanggal Akhir", datetime.now())
 
-    pemasukan_df = load_data("pemasukan.csv", username)
-    pengeluaran_df = load_data("pengeluaran.csv", username)
-    jurnal_df = load_data("jurnal.csv", username)
-
-    for df in [pemasukan_df, pengeluaran_df, jurnal_df]:
-        if not df.empty and "Tanggal" in df.columns:
-            df["Tanggal"] = pd.to_datetime(df["Tanggal"], errors='coerce')
-
-    jurnal_df = jurnal_df[(jurnal_df['Tanggal'] >= pd.to_datetime(mulai)) & (jurnal_df['Tanggal'] <= pd.to_datetime(akhir))]
-
-    tabs = st.tabs(["Ringkasan", "Jurnal Umum", "Buku Besar", "Laba Rugi", "Neraca"])
+    # Hanya bagian yang dipilih yang dihitung dan digambar; bagian lain tidak disentuh
+    bagian = st.radio("Bagian Laporan", BAGIAN_LAPORAN, horizontal=True, label_visibility="collapsed")
+    st.write("---")
+    if bagian in ("Ringkasan", "Laba Rugi", "Neraca"):
+        lap = susun_laporan(username, mulai, akhir)
+        if lap.akun_tak_dikenal:
+            st.warning(PESAN_AKUN_TAK_DIKENAL + ", ".join(map(str, lap.akun_tak_dikenal)))
 
-    with tabs[0]:
+    if bagian == "Ringkasan":
         st.subheader("Ringkasan Keuangan")
-        total_pemasukan = pemasukan_df[(pemasukan_df['Tanggal'] >= pd.to_datetime(mulai)) & 
-                                      (pemasukan_df['Tanggal'] <= pd.to_datetime(akhir))]['Jumlah'].sum() if not pemasukan_df.empty else 0
-        total_pengeluaran = pengeluaran_df[(pengeluaran_df['Tanggal'] >= pd.to_datetime(mulai)) & 
-                                         (pengeluaran_df['Tanggal'] <= pd.to_datetime(akhir))]['Jumlah'].sum() if not pengeluaran_df.empty else 0
-
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Pemasukan", f"Rp {total_pemasukan:,.0f}")
+            st.metric("Total Pemasukan", format_rupiah(lap.total_pemasukan))
         with col2:
-            st.metric("Total Pengeluaran", f"Rp {total_pengeluaran:,.0f}")
+            st.metric("Total Pengeluaran", format_rupiah(lap.total_pengeluaran))
         with col3:
-            saldo = total_pemasukan - total_pengeluaran
-            st.metric("Saldo", f"Rp {saldo:,.0f}")
+            st.metric("Saldo", format_rupiah(lap.saldo))
 
-        if total_pemasukan > 0 or total_pengeluaran > 0:
+        if lap.total_pemasukan > 0 or lap.total_pengeluaran > 0:
             df_sum = pd.DataFrame({
                 'Kategori': ['Pemasukan', 'Pengeluaran'],
-                'Jumlah': [total_pemasukan, total_pengeluaran]
+                'Jumlah': [lap.total_pemasukan, lap.total_pengeluaran]
             })
             fig = px.pie(df_sum, values='Jumlah', names='Kategori', 
                          title="Persentase Pemasukan dan Pengeluaran")
             st.plotly_chart(fig, use_container_width=True)
 
-    with tabs[1]:
+    elif bagian == "Jurnal Umum":
         st.subheader("Jurnal Umum")
-        if not jurnal_df.empty:
-            st.dataframe(jurnal_df.style.format({'Debit': '{:,.0f}', 'Kredit': '{:,.0f}'}), 
-                        use_container_width=True)
+        col1, col2, col3, col4, col5 = st.columns([3, 2, 1, 1, 1])
+        with col1:
+            cari = st.text_input("Cari akun / keterangan")
+        with col2:
+            urut = st.selectbox("Urutkan", KOLOM_URUT_JURNAL)
+        with col3:
+            per_halaman = st.selectbox("Baris", [25, 50, 100])
+        with col4:
+            halaman = st.number_input("Halaman", min_value=1, step=1)
+        with col5:
+            menurun = st.checkbox("Menurun")
+        halaman_df, total, halaman = halaman_jurnal(
+            username, mulai, akhir, int(halaman), per_halaman, urut, menurun, cari.strip()
+        )
+        if total:
+            st.dataframe(halaman_df, column_config=kolom_rupiah("Debit", "Kredit"),
+                        use_container_width=True, hide_index=True)
+            awal = (halaman - 1) * per_halaman
+            st.caption(f"Baris {awal + 1}-{awal + len(halaman_df)} dari {total}, halaman {halaman} dari {-(-total // per_halaman)}")
         else:
             st.warning("Tidak ada data jurnal untuk periode ini.")
 
-    with tabs[2]:
+    elif bagian == "Buku Besar":
         st.subheader("Buku Besar")
+        jurnal_df = load_data_periode("jurnal.csv", username, mulai, akhir)
         if not jurnal_df.empty:
-            akun_list = jurnal_df['Akun'].unique()
-            for akun in akun_list:
+            buku_df, posisi = buku_besar(jurnal_df, saldo_awal(username, mulai))
+            for akun in sorted(posisi, key=kode_akun):
                 with st.expander(f"Akun: {akun}"):
-                    df_akun = jurnal_df[jurnal_df['Akun'] == akun].copy()
-                    df_akun = df_akun.sort_values("Tanggal")
-                    df_akun['Saldo'] = df_akun['Debit'] - df_akun['Kredit']
-                    df_akun['Saldo'] = df_akun['Saldo'].cumsum()
-                    st.dataframe(df_akun.style.format({'Debit': '{:,.0f}', 'Kredit': '{:,.0f}', 'Saldo': '{:,.0f}'}))
+                    df_akun = buku_besar_akun(buku_df, posisi, akun)
+                    st.dataframe(df_akun, column_config=kolom_rupiah("Debit", "Kredit", "Saldo"), hide_index=True)
         else:
             st.warning("Tidak ada data buku besar untuk periode ini.")
 
-    with tabs[3]:
+    elif bagian == "Laba Rugi":
         st.subheader("Laporan Laba Rugi")
-        pendapatan = jurnal_df[jurnal_df['Akun'].str.contains("Pendapatan")]['Kredit'].sum() if not jurnal_df.empty else 0
-        beban = jurnal_df[~jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang', 'Utang Dagang', 'Pendapatan'])]['Debit'].sum() if not jurnal_df.empty else 0
-        laba_rugi = pendapatan - beban
-        
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Pendapatan", f"Rp {pendapatan:,.0f}")
+            st.metric("Pendapatan", format_rupiah(lap.pendapatan))
         with col2:
-            st.metric("Beban", f"Rp {beban:,.0f}")
+            st.metric("Beban", format_rupiah(lap.beban))
         with col3:
-            st.metric("Laba / Rugi", f"Rp {laba_rugi:,.0f}")
+            st.metric("Laba / Rugi", format_rupiah(lap.laba_rugi))
         
-        if pendapatan > 0 or beban > 0:
+        if lap.pendapatan > 0 or lap.beban > 0:
             df_lr = pd.DataFrame({
                 'Kategori': ['Pendapatan', 'Beban'],
-                'Jumlah': [pendapatan, beban]
+                'Jumlah': [lap.pendapatan, lap.beban]
             })
             fig = px.bar(df_lr, x='Kategori', y='Jumlah', 
                         title="Perbandingan Pendapatan dan Beban")
             st.plotly_chart(fig, use_container_width=True)
 
-    with tabs[4]:
+    elif bagian == "Neraca":
         st.subheader("Neraca Keuangan")
-        aktiva = jurnal_df[jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang'])]['Debit'].sum() - jurnal_df[jurnal_df['Akun'].isin(['Kas', 'Bank', 'Piutang Dagang'])]['Kredit'].sum() if not jurnal_df.empty else 0
-        kewajiban = jurnal_df[jurnal_df['Akun'].isin(['Utang Dagang'])]['Kredit'].sum() - jurnal_df[jurnal_df['Akun'].isin(['Utang Dagang'])]['Debit'].sum() if not jurnal_df.empty else 0
-        ekuitas = laba_rugi
-        
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Aktiva", f"Rp {aktiva:,.0f}")
+            st.metric("Aktiva", format_rupiah(lap.aktiva))
         with col2:
-            st.metric("Kewajiban", f"Rp {kewajiban:,.0f}")
+            st.metric("Kewajiban", format_rupiah(lap.kewajiban))
         with col3:
-            st.metric("Ekuitas", f"Rp {ekuitas:,.0f}")
+            st.metric("Ekuitas", format_rupiah(lap.ekuitas))
         
-        if aktiva > 0 or kewajiban > 0 or ekuitas > 0:
+        if lap.aktiva > 0 or lap.kewajiban > 0 or lap.ekuitas > 0:
             df_neraca = pd.DataFrame({
                 'Kategori': ['Aktiva', 'Kewajiban', 'Ekuitas'],
-                'Jumlah': [aktiva, kewajiban, ekuitas]
+                'Jumlah': [lap.aktiva, lap.kewajiban, lap.ekuitas]
             })
             fig = px.pie(df_neraca, values='Jumlah', names='Kategori',
                         title="Komposisi Neraca Keuangan")
             st.plotly_chart(fig, use_container_width=True)
 
+        st.write("---")
+        col1, col2 = st.columns(2)
+        with col1:
+            akun_cek = st.selectbox(
+                "Akun",
+                [a.nama for a in BAGAN_AKUN.values() if a.induk and a.kelas in (KELAS_ASET, KELAS_KEWAJIBAN)],
+            )
+        with col2:
+            tanggal_cek = st.date_input("Pada tanggal", akhir)
+        st.metric(f"Saldo {akun_cek} pada {tanggal_cek:%d-%m-%Y}", format_rupiah(saldo_pada(username, akun_cek, tanggal_cek)))
+
+        if st.button("Hitung Ulang Saldo dari Jurnal"):
+            hitung_ulang_ringkasan(username)
+            st.rerun()
+
 # ==================== MAIN APP ====================
 def main():
     st.set_page_config(
@@ -383,20 +1873,22 @@ def main():
     
     # Sidebar with logo
     with st.sidebar:
-        st.image("aset/logo.jpg", width=80)
+        tampilkan_logo(LEBAR_LOGO_HEADER)
         st.title("SiPadi")
         st.title("Petani Makmur")
         st.write("---")
         
     logged_in = login_register()
     if not logged_in:
+        cek_anggaran_login()
         return
+    panaskan_impor()
     
     # Main menu
     with st.sidebar:
         menu = st.radio(
             "Menu Navigasi",
-            ["Beranda", "Pemasukan", "Pengeluaran", "Laporan", "Logout"],
+            ["Beranda", "Pemasukan", "Pengeluaran", "Impor Excel", "Laporan", "Logout"],
             index=0
         )
     
@@ -426,14 +1918,15 @@ def main():
             pengeluaran_df = load_data("pengeluaran.csv", username)
             
             if not pemasukan_df.empty:
-                pemasukan_df["Tanggal"] = pd.to_datetime(pemasukan_df["Tanggal"])
                 st.write("5 Pemasukan Terakhir")
-                st.dataframe(pemasukan_df.sort_values("Tanggal", ascending=False).head(5)[["Tanggal", "Sumber", "Jumlah"]].style.format({'Jumlah': 'Rp {:,.0f}'}))
+                # Tabel di cache sudah urut Tanggal (NaT di akhir), lima terakhir cukup diambil dari ekornya
+                st.dataframe(pemasukan_df.iloc[:pemasukan_df["Tanggal"].count()].tail(5).iloc[::-1][["Tanggal", "Sumber", "Jumlah"]],
+                             column_config=kolom_rupiah("Jumlah"), hide_index=True)
             
             if not pengeluaran_df.empty:
-                pengeluaran_df["Tanggal"] = pd.to_datetime(pengeluaran_df["Tanggal"])
                 st.write("5 Pengeluaran Terakhir")
-                st.dataframe(pengeluaran_df.sort_values("Tanggal", ascending=False).head(5)[["Tanggal", "Kategori", "Jumlah"]].style.format({'Jumlah': 'Rp {:,.0f}'}))
+                st.dataframe(pengeluaran_df.iloc[:pengeluaran_df["Tanggal"].count()].tail(5).iloc[::-1][["Tanggal", "Kategori", "Jumlah"]],
+                             column_config=kolom_rupiah("Jumlah"), hide_index=True)
 
     elif menu == "Pemasukan":
         pemasukan()
@@ -441,10 +1934,14 @@ def main():
     elif menu == "Pengeluaran":
         pengeluaran()
 
+    elif menu == "Impor Excel":
+        impor_excel()
+
     elif menu == "Laporan":
         laporan()
 
     elif menu == "Logout":
+        akhiri_sesi()
         st.session_state['logged_in'] = False
         st.session_state['username'] = ""
         st.success("Anda telah berhasil logout.")
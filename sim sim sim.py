@@ -14,8 +14,19 @@ def save_data(df, file):
 def append_data(data, file):
     df_new = pd.DataFrame([data])
     df = pd.concat([load_data(file), df_new], ignore_index=True)
+    if "Tanggal" in df.columns:
+        # Disimpan urut Tanggal agar laporan bisa memotong rentang dengan binary search
+        df = df.sort_values("Tanggal", kind="stable", na_position="last")
     save_data(df, file)
 
+def potong_tanggal(df, mulai, akhir):
+    # File disimpan urut Tanggal, jadi rentang cukup dicari dengan binary search
+    if not df["Tanggal"].is_monotonic_increasing:
+        df = df.sort_values("Tanggal", kind="stable", na_position="last")
+    kiri = df["Tanggal"].searchsorted(pd.to_datetime(mulai), side="left")
+    kanan = df["Tanggal"].searchsorted(pd.to_datetime(akhir), side="right")
+    return df.iloc[kiri:kanan]
+
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan):
     return [
         {"Tanggal": tanggal, "Akun": akun_debit, "Debit": jumlah, "Kredit": 0, "Keterangan": keterangan},
@@ -82,73 +93,78 @@ kategori_pemasukan = {
 }
 
 # ---------- Pemasukan ----------
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)") 
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip() or jumlah <= 0:
-            st.error("Isi data dengan benar.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode
-        }
-        append_data(data, "pemasukan.csv")
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)") 
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip() or jumlah <= 0:
+                st.error("Isi data dengan benar.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode
+            }
+            append_data(data, "pemasukan.csv")
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------- Pengeluaran ----------
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode
-        }
-        append_data(data, "pengeluaran.csv")
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
-        for j in jurnal:
-            append_data(j, "jurnal.csv")
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode
+            }
+            append_data(data, "pengeluaran.csv")
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
+            for j in jurnal:
+                append_data(j, "jurnal.csv")
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------- Laporan ----------
 def laporan():
@@ -166,20 +182,11 @@ def laporan():
 
     # Filter tanggal
     if not jurnal_df.empty and "Tanggal" in jurnal_df.columns:
-        jurnal_df = jurnal_df[
-            (jurnal_df["Tanggal"] >= pd.to_datetime(mulai)) &
-            (jurnal_df["Tanggal"] <= pd.to_datetime(akhir))
-        ]
+        jurnal_df = potong_tanggal(jurnal_df, mulai, akhir)
     if not pemasukan_df.empty and "Tanggal" in pemasukan_df.columns:
-        pemasukan_df = pemasukan_df[
-            (pemasukan_df["Tanggal"] >= pd.to_datetime(mulai)) &
-            (pemasukan_df["Tanggal"] <= pd.to_datetime(akhir))
-        ]
+        pemasukan_df = potong_tanggal(pemasukan_df, mulai, akhir)
     if not pengeluaran_df.empty and "Tanggal" in pengeluaran_df.columns:
-        pengeluaran_df = pengeluaran_df[
-            (pengeluaran_df["Tanggal"] >= pd.to_datetime(mulai)) &
-            (pengeluaran_df["Tanggal"] <= pd.to_datetime(akhir))
-        ]
+        pengeluaran_df = potong_tanggal(pengeluaran_df, mulai, akhir)
 
     tabs = st.tabs(["Ringkasan", "Jurnal Umum", "Buku Besar", "Laba Rugi", "Neraca"])
 
@@ -0,0 +1,532 @@
+import os
+import io
+import re
+import csv
+import glob
+import json
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+import threading
+import importlib
+import logging
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Bagian yang dipakai bersama oleh proyek.py, hebat.py dan c.py. Aplikasi
+# mengimpor dari sini, jadi perubahan cukup dibuat sekali.
+
+# ==================== SCHEMA REGISTRY ====================
+# Satu-satunya tempat kolom dan tipe data tiap tabel didefinisikan.
+# Rupiah disimpan sebagai int64, kolom berulang sebagai category,
+# dan Tanggal di-parse sekali saat dibaca dengan format yang pasti.
+# Kolom di luar skema (mis. Username di jurnal c.py) dibaca apa adanya.
+FORMAT_TANGGAL = "%Y-%m-%d %H:%M:%S"
+
+SKEMA_TABEL = {
+    "pemasukan": {
+        "Tanggal": "datetime64[ns]",
+        "Sumber": "category",
+        "Jumlah": "int64",
+        "Metode": "category",
+        "Keterangan": "object",
+        "Username": "category",
+    },
+    "pengeluaran": {
+        "Tanggal": "datetime64[ns]",
+        "Kategori": "category",
+        "Sub Kategori": "category",
+        "Jumlah": "int64",
+        "Keterangan": "object",
+        "Metode": "category",
+        "Username": "category",
+    },
+    "jurnal": {
+        "Tanggal": "datetime64[ns]",
+        "Akun": "category",
+        "Debit": "int64",
+        "Kredit": "int64",
+        "Keterangan": "object",
+    },
+    "akun": {
+        "Username": "object",
+        "Password": "object",
+    },
+}
+
+KOLOM_TABEL = {tabel: list(skema) for tabel, skema in SKEMA_TABEL.items()}
+
+KOLOM_INTEGER = {k for skema in SKEMA_TABEL.values() for k, t in skema.items() if t == "int64"}
+
+class KosaKata:
+    # Kosakata dasar per nama kolom (mis. Akun dari BAGAN_AKUN) yang dikenalkan aplikasi dan
+    # dipakai bersama semua tabel dalam proses, jadi kode "Kas" tidak pernah berubah. Nilai di
+    # luar kosakata dasar hanya ditambahkan ke dtype tabel yang memuatnya: kosakata bersama
+    # tidak ikut tumbuh, dan nama akun satu user tidak pernah muncul di dtype user lain.
+    def __init__(self):
+        self.dtype = {}
+        self.lock = threading.Lock()
+
+    def kenalkan(self, kolom, daftar):
+        with self.lock:
+            lama = self.dtype.get(kolom)
+            dasar = list(lama.categories) if lama is not None else []
+            baru = [d for d in dict.fromkeys(daftar) if d not in set(dasar)]
+            if lama is None or baru:
+                self.dtype[kolom] = pd.CategoricalDtype(dasar + baru)
+
+    def untuk(self, kolom, nilai):
+        unik = nilai.cat.categories if isinstance(nilai.dtype, pd.CategoricalDtype) else nilai.dropna().unique()
+        dasar = self.dtype.get(kolom)
+        if dasar is None:
+            return pd.CategoricalDtype(unik)
+        lain = pd.Index(unik).difference(dasar.categories)
+        if not len(lain):
+            return dasar
+        return pd.CategoricalDtype(list(dasar.categories) + list(lain))
+
+@st.cache_resource
+def get_kosakata():
+    return KosaKata()
+
+def kenalkan(kolom, daftar):
+    get_kosakata().kenalkan(kolom, daftar)
+
+def kodekan(kolom, nilai):
+    dtype = get_kosakata().untuk(kolom, nilai)
+    return nilai if nilai.dtype == dtype else nilai.astype(dtype)
+
+def cocok_kategori(kolom, pola):
+    # Teks dicocokkan sekali ke daftar kategori, lalu disebar ke baris lewat kode integer
+    cocok = np.append(kolom.cat.categories.astype(str).str.contains(pola, case=False, regex=False), False)
+    return pd.Series(cocok[kolom.cat.codes.to_numpy()], index=kolom.index)
+
+def nama_tabel(base_filename):
+    return os.path.splitext(os.path.basename(base_filename))[0]
+
+def empty_df(tabel, kolom=None):
+    skema = SKEMA_TABEL.get(tabel, {})
+    kolom = kolom or list(skema)
+    return pd.DataFrame({k: pd.Series(dtype=skema.get(k, "object")) for k in kolom})
+
+def parse_tanggal(kolom):
+    # FORMAT_TANGGAL adalah kasus umum dan diurai cepat; baris lain (mis. "2024-01-05"
+    # dari CSV lama atau hasil edit manual) diurai fleksibel agar tidak hilang jadi NaT
+    tanggal = pd.to_datetime(kolom, format=FORMAT_TANGGAL, errors="coerce")
+    lain = tanggal.isna() & kolom.notna()
+    if lain.any():
+        tanggal[lain] = pd.to_datetime(kolom[lain].astype(str), errors="coerce", format="mixed")
+    return tanggal
+
+def terapkan_skema(df, tabel):
+    for k, tipe in SKEMA_TABEL.get(tabel, {}).items():
+        if k not in df.columns:
+            continue
+        if tipe == "category":
+            df[k] = kodekan(k, df[k])
+            continue
+        if df[k].dtype == tipe:
+            continue
+        if tipe == "datetime64[ns]":
+            if not pd.api.types.is_datetime64_any_dtype(df[k]):
+                df[k] = parse_tanggal(df[k])
+        elif tipe == "int64":
+            df[k] = pd.to_numeric(df[k], errors="coerce").fillna(0).round().astype("int64")
+        else:
+            df[k] = df[k].astype(tipe)
+    return df
+
+def rupiah(nilai):
+    # Uang selalu Rupiah utuh (int); desimal dan NaN tidak boleh masuk ke jurnal
+    if pd.isna(nilai):
+        return 0
+    if float(nilai) != int(nilai):
+        raise ValueError("Jumlah harus dalam Rupiah utuh.")
+    return int(nilai)
+
+def format_rupiah(nilai):
+    # Pemformatan hanya saat ditampilkan; angka di data tetap int
+    return f"Rp {int(nilai):,}"
+
+def baca_csv(filename, tabel):
+    # dtype untuk kolom teks langsung diberikan ke parser, sisanya dikonversi sekali
+    skema = SKEMA_TABEL.get(tabel, {})
+    dtype = {k: t for k, t in skema.items() if t in ("category", "object")}
+    try:
+        df = pd.read_csv(filename, dtype=dtype)
+    except pd.errors.EmptyDataError:
+        return empty_df(tabel)
+    return terapkan_skema(df, tabel)
+
+def format_tanggal(df):
+    # Tanggal selalu ditulis lengkap dengan jam agar cocok dengan FORMAT_TANGGAL
+    if "Tanggal" in df.columns and pd.api.types.is_datetime64_any_dtype(df["Tanggal"]):
+        df = df.copy()
+        df["Tanggal"] = df["Tanggal"].dt.strftime(FORMAT_TANGGAL)
+    return df
+
+def urutkan_tanggal(df):
+    # Tabel disimpan urut Tanggal (stabil, NaT di akhir) supaya rentang bisa dicari dengan binary search
+    if "Tanggal" in df.columns and not df["Tanggal"].is_monotonic_increasing:
+        df = df.sort_values("Tanggal", kind="stable", na_position="last", ignore_index=True)
+    return df
+
+def rentang_tanggal(mulai=None, akhir=None):
+    # Rentang dipilih per hari: [awal hari mulai, awal hari setelah akhir). Batas kanan
+    # eksklusif agar transaksi pada hari terakhir (jam berapa pun) ikut terhitung.
+    awal = pd.Timestamp(mulai).normalize() if mulai is not None else None
+    batas = pd.Timestamp(akhir).normalize() + pd.Timedelta(days=1) if akhir is not None else None
+    return awal, batas
+
+def potong_tanggal(df, mulai=None, akhir=None):
+    # df harus sudah urut Tanggal; hasilnya irisan baris dalam rentang, tanpa memindai semua baris
+    awal, batas = rentang_tanggal(mulai, akhir)
+    kiri, kanan = 0, len(df)
+    if awal is not None:
+        kiri = df["Tanggal"].searchsorted(awal, side="left")
+    if batas is not None:
+        kanan = df["Tanggal"].searchsorted(batas, side="left")
+    return df.iloc[kiri:kanan]
+
+# ==================== IMPOR TERTUNDA ====================
+# plotly hanya dipakai laporan, jadi tidak ikut diimpor saat halaman login
+# pertama kali dibuka. Setelah login, impornya dipanaskan di thread latar
+# agar grafik pertama tidak menunggu.
+MODUL_BERAT = ["plotly.express"]
+
+def muat_plotly():
+    import plotly.express as px
+    return px
+
+def _impor_modul_berat():
+    # Kegagalan di thread latar dicatat; laporan akan menampilkan galatnya saat muat_plotly
+    for nama in MODUL_BERAT:
+        try:
+            importlib.import_module(nama)
+        except Exception:
+            logging.getLogger("sipadi").exception("Gagal memanaskan impor %s", nama)
+
+@st.cache_resource
+def panaskan_impor():
+    thread = threading.Thread(target=_impor_modul_berat, name="panaskan-impor", daemon=True)
+    thread.start()
+    return thread
+
+# ==================== ASET STATIS ====================
+# Gambar dibaca, di-resize ke ukuran yang benar-benar ditampilkan, dan disimpan
+# sebagai bytes sekali per proses. Setiap rerun mengirim bytes yang identik, jadi
+# Streamlit melayaninya dari media file yang sama tanpa decode ulang. Hanya satu
+# entri per (path, lebar): saat file berubah (hash isi berbeda) entri lama diganti.
+class ManajerAset:
+    def __init__(self):
+        self.hash_file = {}
+        self.gambar_siap = {}
+        self.lock = threading.Lock()
+
+    def hash_isi(self, path):
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            return None, None
+        versi = (info.st_mtime_ns, info.st_size)
+        with self.lock:
+            entri = self.hash_file.get(path)
+        if entri is not None and entri[0] == versi:
+            return entri[1], None
+        with open(path, "rb") as f:
+            isi = f.read()
+        digest = hashlib.sha256(isi).hexdigest()
+        with self.lock:
+            self.hash_file[path] = (versi, digest)
+        return digest, isi
+
+    def gambar(self, path, lebar):
+        digest, isi = self.hash_isi(path)
+        if digest is None:
+            return None
+        kunci = (path, lebar)
+        with self.lock:
+            entri = self.gambar_siap.get(kunci)
+        if entri is not None and entri[0] == digest:
+            return entri[1]
+        if isi is None:
+            with open(path, "rb") as f:
+                isi = f.read()
+        data = perkecil_gambar(isi, lebar)
+        with self.lock:
+            self.gambar_siap[kunci] = (digest, data)
+        return data
+
+def perkecil_gambar(isi, lebar):
+    from PIL import Image
+    with Image.open(io.BytesIO(isi)) as gambar:
+        if gambar.width <= lebar:
+            return isi
+        tinggi = max(1, round(gambar.height * lebar / gambar.width))
+        kecil = gambar.convert("RGB").resize((lebar, tinggi), Image.LANCZOS)
+    keluaran = io.BytesIO()
+    kecil.save(keluaran, format="PNG", optimize=True)
+    return keluaran.getvalue()
+
+@st.cache_resource
+def get_manajer_aset():
+    return ManajerAset()
+
+# ==================== SESI LOGIN ====================
+# Setelah login, token bertanda tangan HMAC berisi username dan waktu
+# kedaluwarsa disimpan di cookie (SameSite=Strict), jadi reload halaman langsung
+# masuk tanpa form login dan tanpa menyentuh akun.csv. Token tidak pernah ditaruh
+# di URL. Token dicek ke tabel sesi di memori; logout menghapusnya dari tabel
+# sehingga token lama tidak berlaku.
+#
+# Cookie ditulis oleh JavaScript di halaman (Streamlit tidak memberi akses ke
+# header Set-Cookie), jadi cookie ini TIDAK bisa HttpOnly dan terbaca oleh skrip
+# apa pun di halaman yang sama. Karena itu isinya hanya token acak bertanda
+# tangan yang bisa dicabut, dan masa berlakunya dibatasi MASA_SESI.
+MASA_SESI = int(float(os.environ.get("SIPADI_MASA_SESI_JAM", "12")) * 3600)
+KUNCI_SESI_FILE = "data/kunci_sesi"
+
+def baca_kunci_sesi():
+    kunci = os.environ.get("SIPADI_KUNCI_SESI")
+    if kunci:
+        return kunci.encode()
+    os.makedirs(os.path.dirname(KUNCI_SESI_FILE), exist_ok=True)
+    try:
+        fd = os.open(KUNCI_SESI_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(KUNCI_SESI_FILE, "rb") as f:
+            return f.read()
+    kunci = secrets.token_bytes(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(kunci)
+    return kunci
+
+class TabelSesi:
+    def __init__(self, kunci):
+        self.kunci = kunci
+        self.sesi = {}
+        self.lock = threading.Lock()
+
+    def tanda(self, isi):
+        return hmac.new(self.kunci, isi.encode(), hashlib.sha256).hexdigest()
+
+    def buat(self, username):
+        kedaluwarsa = int(time.time()) + MASA_SESI
+        nama = base64.urlsafe_b64encode(username.encode()).decode().rstrip("=")
+        isi = f"{nama}.{kedaluwarsa}.{secrets.token_urlsafe(12)}"
+        token = f"{isi}.{self.tanda(isi)}"
+        with self.lock:
+            sekarang = time.time()
+            for lama in [t for t, (_, batas) in self.sesi.items() if batas < sekarang]:
+                del self.sesi[lama]
+            self.sesi[token] = (username, kedaluwarsa)
+        return token
+
+    def cek(self, token):
+        isi, _, tanda = token.rpartition(".")
+        if not isi or not hmac.compare_digest(tanda, self.tanda(isi)):
+            return None
+        with self.lock:
+            entri = self.sesi.get(token)
+            if entri is None:
+                return None
+            if entri[1] < time.time():
+                del self.sesi[token]
+                return None
+            return entri[0]
+
+    def hapus(self, token):
+        with self.lock:
+            self.sesi.pop(token, None)
+
+@st.cache_resource
+def get_tabel_sesi():
+    return TabelSesi(baca_kunci_sesi())
+
+def tulis_cookie_sesi(nama_cookie):
+    # st.context.cookies hanya bisa dibaca, jadi cookie ditulis dengan skrip kecil
+    # pada run setelah st.rerun login/logout. Isinya hanya token buatan server.
+    nilai = st.session_state.pop('cookie_sesi', None)
+    if nilai is None:
+        return
+    st.html(
+        "<script>"
+        "const aman = location.protocol === 'https:' ? '; Secure' : '';"
+        f"document.cookie = '{nama_cookie}={nilai}; Max-Age={MASA_SESI if nilai else 0}; "
+        "Path=/; SameSite=Strict' + aman;"
+        "</script>",
+        unsafe_allow_javascript=True,
+    )
+
+def mulai_sesi(username):
+    token = get_tabel_sesi().buat(username)
+    st.session_state['token_sesi'] = token
+    st.session_state['cookie_sesi'] = token
+
+def pulihkan_sesi(nama_cookie):
+    if "sesi" in st.query_params:
+        # Token di URL (versi lama) tidak dipakai: URL tersimpan di riwayat dan ikut terbagi
+        del st.query_params["sesi"]
+    token = st.context.cookies.get(nama_cookie)
+    if not token:
+        return None
+    username = get_tabel_sesi().cek(token)
+    if username is None:
+        st.session_state['cookie_sesi'] = ""
+        return None
+    st.session_state['token_sesi'] = token
+    return username
+
+def akhiri_sesi():
+    token = st.session_state.pop('token_sesi', None)
+    if token:
+        get_tabel_sesi().hapus(token)
+    st.session_state['cookie_sesi'] = ""
+
+# ==================== POSTING ATOMIK ====================
+# Satu posting (dokumen sumber + semua baris jurnalnya) ditulis dalam satu commit:
+#  1. penanda <folder>/<pid>-<hex>.pending berisi ukuran tiap CSV ledger sebelum
+#     ditambah dan daftar file sementara yang akan menggantikan targetnya.
+#     Penanda dan foldernya di-fsync sebelum file ledger disentuh.
+#  2. Baris ditambahkan ke tiap CSV ledger, masing-masing di-fsync sekali.
+#  3. os.replace file sementara (titik commit), lalu folder yang entrinya harus
+#     awet sebelum penanda dihapus di-fsync.
+#  4. Penanda dihapus.
+# Posting yang terputus sebelum titik commit dibatalkan (CSV dipotong kembali),
+# yang terputus sesudahnya diselesaikan. Tanpa file sementara, titik commit adalah
+# saat penanda dihapus. Folder penanda terpisah per user, jadi penanda user "x"
+# tidak pernah tertukar dengan milik "x.1".
+@st.cache_resource
+def get_kunci_posting(username):
+    # Satu kunci per user untuk semua sesi; RLock karena posting ikut memanggil
+    # load_data dan pulihkan_posting yang mengambil kunci yang sama
+    return threading.RLock()
+
+def nama_unik():
+    return f"{os.getpid()}-{secrets.token_hex(4)}"
+
+def file_sementara(target):
+    # Nama unik per penulis, jadi dua posting tidak pernah berbagi file sementara yang sama
+    return f"{target}.{nama_unik()}.tmp"
+
+def daftar_unik(folder, nama, akhiran):
+    pola = re.compile(nama + r"\.\d+-[0-9a-f]{8}\." + re.escape(akhiran))
+    try:
+        isi = os.listdir(folder or ".")
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.join(folder, n) for n in isi if pola.fullmatch(n))
+
+def cari_unik(dasar, akhiran):
+    # Persis <dasar>.<pid>-<hex>.<akhiran>; glob "<dasar>.*" bisa ikut menangkap file user lain
+    folder, nama = os.path.split(dasar)
+    return daftar_unik(folder, re.escape(nama), akhiran)
+
+def sapu_sementara(targets):
+    # File sementara yatim (posting terputus sebelum penandanya ditulis) dari file atau
+    # folder milik user dibuang. Dipanggil di bawah kunci posting, jadi tidak ada
+    # posting lain yang sedang menyiapkannya.
+    for target in targets:
+        if os.path.isdir(target):
+            yatim = daftar_unik(target, ".+", "tmp")
+        else:
+            yatim = cari_unik(target, "tmp")
+        for tmp in yatim:
+            os.remove(tmp)
+
+def fsync_folder(folder):
+    # Entri folder (file baru, hasil os.replace) baru awet setelah foldernya di-fsync.
+    # Windows tidak mengenal fsync folder dan tidak memerlukannya.
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(folder or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def baca_header(filename):
+    with open(filename, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+def siapkan_baris(rows, filename, kolom):
+    # Menyiapkan teks CSV untuk baris baru saja; header (kolom) ikut hanya saat file baru dibuat
+    df_baru = pd.DataFrame(rows)
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        header = baca_header(filename)
+        if not set(df_baru.columns) <= set(header):
+            # Ada kolom yang belum ada di header, tulis ulang sekali agar header ikut diperbarui
+            header = header + [c for c in df_baru.columns if c not in header]
+            lama = pd.read_csv(filename, dtype=str, keep_default_na=False)
+            tmp = file_sementara(filename)
+            lama.reindex(columns=header).to_csv(tmp, index=False)
+            os.replace(tmp, filename)
+        teks = df_baru.reindex(columns=header).to_csv(header=False, index=False)
+        with open(filename, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                teks = "\n" + teks
+    else:
+        kolom = list(kolom) + [c for c in df_baru.columns if c not in kolom]
+        teks = df_baru.reindex(columns=kolom).to_csv(index=False)
+    return filename, teks
+
+def daftar_pending(folder):
+    return sorted(glob.glob(os.path.join(glob.escape(folder), "*.pending")))
+
+def pulihkan_pending(pending):
+    try:
+        with open(pending, encoding="utf-8") as f:
+            catatan = json.load(f)
+    except ValueError:
+        # Penanda belum selesai ditulis, berarti belum ada baris yang ikut tertulis;
+        # file sementaranya disapu oleh sapu_sementara
+        catatan = {}
+    ganti = catatan.get("ganti", [])
+    if any(not os.path.exists(tmp) for tmp, _ in ganti):
+        # Sudah lewat titik commit: semua baris CSV tertulis, tinggal selesaikan penggantian file
+        for tmp, target in ganti:
+            if os.path.exists(tmp):
+                os.replace(tmp, target)
+    else:
+        for filename, size in catatan.get("ukuran", {}).items():
+            if os.path.exists(filename) and os.path.getsize(filename) > size:
+                with open(filename, "rb+") as f:
+                    f.truncate(size)
+        for tmp, _ in ganti:
+            os.remove(tmp)
+    os.remove(pending)
+
+def pulihkan_folder(folder, username, sementara=()):
+    # Posting yang terputus di tengah jalan diselesaikan atau dibatalkan. Kunci per user
+    # memastikan posting yang masih berjalan di sesi lain tidak ikut "dipulihkan".
+    with get_kunci_posting(username):
+        for pending in daftar_pending(folder):
+            pulihkan_pending(pending)
+        sapu_sementara(sementara)
+
+def commit_posting(folder, tulisan, ganti=(), folder_awet=()):
+    # tulisan: [(file CSV, teks)] yang ditambahkan; ganti: [[tmp, target]];
+    # folder_awet: folder target yang hasil os.replace-nya harus awet sebelum penanda dihapus
+    os.makedirs(folder, exist_ok=True)
+    pending = os.path.join(folder, f"{nama_unik()}.pending")
+    ukuran = {fn: (os.path.getsize(fn) if os.path.exists(fn) else 0) for fn, _ in tulisan}
+    folder_awet = set(folder_awet) | {os.path.dirname(fn) for fn, _ in tulisan if not os.path.exists(fn)}
+    with open(pending, "w", encoding="utf-8") as f:
+        json.dump({"ukuran": ukuran, "ganti": [list(g) for g in ganti]}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    fsync_folder(folder)
+    for filename, teks in tulisan:
+        with open(filename, "a", newline="", encoding="utf-8") as f:
+            f.write(teks)
+            f.flush()
+            os.fsync(f.fileno())
+    for tmp, target in ganti:
+        os.replace(tmp, target)
+    for d in folder_awet:
+        fsync_folder(d)
+    os.remove(pending)
@@ -1,10 +1,14 @@
 import streamlit as st
 from datetime import datetime
 import os
+import sys
+import csv
 import hashlib
 import pandas as pd
-import plotly.express as px 
-from PIL import Image
+
+# sipadi_core ada di folder induk aplikasi ini
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sipadi_core import muat_plotly, panaskan_impor, get_manajer_aset
 
 # Atur layout halaman
 st.set_page_config(
@@ -15,9 +19,8 @@ st.set_page_config(
 )
 
 # Set background hijau tanpa HTML
-def set_background():
-    st.markdown(
-        """
+# Blok CSS dirakit sekali saat modul dimuat; setiap rerun mengirim string yang sama.
+CSS_BACKGROUND = """
         <style>
         .stApp {
             background-color: #e8f5e9;
@@ -26,9 +29,10 @@ def set_background():
             background-color: #2e7d32;
         }
         </style>
-        """,
-        unsafe_allow_html=True
-    )
+        """
+
+def set_background():
+    st.markdown(CSS_BACKGROUND, unsafe_allow_html=True)
 
 set_background()
 
@@ -73,9 +77,26 @@ def save_data(df, base_filename, username):
     df.to_csv(filename, index=False)
 
 def append_data(data, base_filename, username):
-    df = load_data(base_filename, username)
-    df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-    save_data(df, base_filename, username)
+    # Hanya baris baru yang ditulis; header ditulis saat file pertama kali dibuat
+    filename = get_user_file(base_filename, username)
+    df_baru = pd.DataFrame([data])
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        with open(filename, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        if not set(df_baru.columns) <= set(header):
+            # Ada kolom yang belum ada di header, tulis ulang sekali agar header ikut diperbarui
+            df = pd.concat([load_data(base_filename, username), df_baru], ignore_index=True)
+            save_data(df, base_filename, username)
+            return
+        with open(filename, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        df_baru.reindex(columns=header).to_csv(filename, mode="a", header=False, index=False)
+    else:
+        kolom = list(load_data(base_filename, username).columns)
+        kolom += [c for c in df_baru.columns if c not in kolom]
+        df_baru.reindex(columns=kolom).to_csv(filename, index=False)
 
 def buat_jurnal(tanggal, akun_debit, akun_kredit, jumlah, keterangan):
     return [
@@ -163,85 +184,91 @@ kategori_pemasukan = {
 
 # ---------------- Fungsi Pemasukan ----------------
 
+@st.fragment
 def pemasukan():
     st.subheader("Tambah Pemasukan")
-    tanggal = st.date_input("Tanggal", datetime.now())
-    sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)") 
-    metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
-
-    if st.button("✅ Simpan Pemasukan"):
-        if not sumber.strip() or jumlah <= 0:
-            st.error("Isi data dengan benar.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Sumber": sumber,
-            "Jumlah": jumlah,
-            "Metode": metode,
-            "Keterangan": deskripsi,
-            "Username": username
-        }
-        append_data(data, "pemasukan.csv", username)
-        akun_debit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Piutang": "Piutang Dagang",
-            "Pelunasan Piutang": "Kas"
-        }[metode]
-        akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pemasukan berhasil disimpan.")
+    with st.form("form_pemasukan", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sumber = st.selectbox("Sumber Pemasukan", kategori_pemasukan["Sumber Pemasukan"])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)") 
+        metode = st.radio("Metode Penerimaan", ["Tunai", "Transfer", "Piutang", "Pelunasan Piutang"])
+
+        if st.form_submit_button("✅ Simpan Pemasukan"):
+            if not sumber.strip() or jumlah <= 0:
+                st.error("Isi data dengan benar.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Sumber": sumber,
+                "Jumlah": jumlah,
+                "Metode": metode,
+                "Keterangan": deskripsi,
+                "Username": username
+            }
+            append_data(data, "pemasukan.csv", username)
+            akun_debit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Piutang": "Piutang Dagang",
+                "Pelunasan Piutang": "Kas"
+            }[metode]
+            akun_kredit = "Pendapatan" if metode != "Pelunasan Piutang" else "Piutang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, sumber)
+            for j in jurnal:
+                append_data(j, "jurnal.csv", username)
+            st.success("✅ Pemasukan berhasil disimpan.")
 
 # ---------------- Fungsi Pengeluaran ----------------
 
+@st.fragment
 def pengeluaran():
     st.subheader("Tambah Pengeluaran")
-    tanggal = st.date_input("Tanggal", datetime.now())
+    # Di luar form: pilihan Sub Kategori bergantung padanya
     kategori = st.selectbox("Kategori Utama", list(kategori_pengeluaran.keys()))
-    sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
-    jumlah = st.number_input("Jumlah (Rp)", min_value=0)
-    deskripsi = st.text_area("Keterangan (opsional)")
-    metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
-
-    if st.button("✅ Simpan Pengeluaran"):
-        if jumlah <= 0:
-            st.error("Jumlah tidak boleh 0.")
-            return
-        waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
-        username = st.session_state['username']
-        data = {
-            "Tanggal": waktu,
-            "Kategori": kategori,
-            "Sub Kategori": sub_kategori,
-            "Jumlah": jumlah,
-            "Keterangan": deskripsi,
-            "Metode": metode,
-            "Username": username
-        }
-        append_data(data, "pengeluaran.csv", username)
-        akun_kredit = {
-            "Tunai": "Kas",
-            "Transfer": "Bank",
-            "Utang": "Utang Dagang",
-            "Pelunasan Utang": "Kas"
-        }[metode]
-        akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
-        jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
-        for j in jurnal:
-            append_data(j, "jurnal.csv", username)
-        st.success("✅ Pengeluaran berhasil disimpan.")
+    with st.form("form_pengeluaran", clear_on_submit=True):
+        tanggal = st.date_input("Tanggal", datetime.now())
+        sub_kategori = st.selectbox("Sub Kategori", kategori_pengeluaran[kategori])
+        jumlah = st.number_input("Jumlah (Rp)", min_value=0)
+        deskripsi = st.text_area("Keterangan (opsional)")
+        metode = st.radio("Metode Pembayaran", ["Tunai", "Transfer", "Utang", "Pelunasan Utang"])
+
+        if st.form_submit_button("✅ Simpan Pengeluaran"):
+            if jumlah <= 0:
+                st.error("Jumlah tidak boleh 0.")
+                return
+            waktu = tanggal.strftime("%Y-%m-%d %H:%M:%S")
+            username = st.session_state['username']
+            data = {
+                "Tanggal": waktu,
+                "Kategori": kategori,
+                "Sub Kategori": sub_kategori,
+                "Jumlah": jumlah,
+                "Keterangan": deskripsi,
+                "Metode": metode,
+                "Username": username
+            }
+            append_data(data, "pengeluaran.csv", username)
+            akun_kredit = {
+                "Tunai": "Kas",
+                "Transfer": "Bank",
+                "Utang": "Utang Dagang",
+                "Pelunasan Utang": "Kas"
+            }[metode]
+            akun_debit = sub_kategori if metode != "Pelunasan Utang" else "Utang Dagang"
+            jurnal = buat_jurnal(waktu, akun_debit, akun_kredit, jumlah, deskripsi)
+            for j in jurnal:
+                append_data(j, "jurnal.csv", username)
+            st.success("✅ Pengeluaran berhasil disimpan.")
 
 # ---------------- Fungsi Laporan ----------------
 
 def laporan():
     st.header("Laporan Keuangan")
     username = st.session_state['username']
+    px = muat_plotly()
 
     mulai = st.date_input("Tanggal Mulai", datetime.now().replace(day=1))
     akhir = st.date_input("Tanggal Akhir", datetime.now())
@@ -314,14 +341,25 @@ def laporan():
 
 
 # ---------------- Fungsi Logo ----------------
+# Logo di-resize sekali per proses oleh ManajerAset (sipadi_core) ke ukuran
+# yang ditampilkan, jadi rerun tidak membuka PIL lagi.
+LOGO_FILE = "logo.jpg"
+LEBAR_LOGO_HEADER = 80
+LEBAR_LOGO_SIDEBAR = 200
+
+def gambar_logo(lebar):
+    return get_manajer_aset().gambar(LOGO_FILE, lebar)
+
 def tampilkan_logo():
     try:
-        logo = Image.open("logo.jpg")
-        st.sidebar.image(logo, width=200)
-        return logo
-    except:
+        logo = gambar_logo(LEBAR_LOGO_SIDEBAR)
+    except Exception:
+        logo = None
+    if logo is None:
         st.sidebar.title("SiPadi 🌾")
         return None
+    st.sidebar.image(logo, width=LEBAR_LOGO_SIDEBAR)
+    return logo
 
 # ---------------- UI Utama ----------------
 def main():
@@ -331,12 +369,13 @@ def main():
     logged_in = login_register()
     if not logged_in:
         return
+    panaskan_impor()
     
     # Tampilkan logo kecil di header jika di halaman Beranda
     if logo and st.sidebar.radio("Pilih Menu", ["Beranda", "Pemasukan", "Pengeluaran", "Laporan", "Logout"]) == "Beranda":
         col1, col2 = st.columns([1,4])
         with col1:
-            st.image(logo, width=80)
+            st.image(gambar_logo(LEBAR_LOGO_HEADER), width=LEBAR_LOGO_HEADER)
         with col2:
             st.title(f"Selamat datang, {st.session_state['username']}!")
     else: